@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from telemetry import METRIC_INDEX, METRICS
+
+##############################################################################################################
+# Alerts
+##############################################################################################################
+
+
+# Layout of the alert state of a fleet: a version bumped whenever the set of active alerts changes, then per
+# satellite and rule whether the alert is active and since when
+def alert_dtype(satellites, rules):
+    return np.dtype([('version', '<i8'), ('active', '?', (satellites, rules)), ('since', '<f8', (satellites, rules))])
+
+
+# Threshold rules evaluated on the newest sample of every satellite at once, after each batch of ingested
+# telemetry. Rules are loaded from a json config of the form
+#   {'rules': [{'name', 'message', 'metric', 'below' or 'above', 'clear', 'indicator'}, ...]}
+# An alert is raised when the metric goes below (or above) the threshold and cleared once it is back above
+# (below) clear, so that values hovering around the threshold don't flap. indicator optionally names a control
+# panel component shown in alert color while the alert is active on the selected satellite. The state can live
+# in an array owned by someone else (e.g. shared memory), one record of alert_dtype.
+class AlertEngine:
+    def __init__(self, rules, satellites, state=None):
+        self.rules = rules
+        self.satellites = list(satellites)
+        self.index = {satellite: i for i, satellite in enumerate(self.satellites)}
+        self.columns = np.array([METRIC_INDEX[rule['metric']] for rule in rules], dtype=np.intp)
+        # Rules raising below their threshold are compared on negated values, so that all compare the same way.
+        # Repeated for every satellite, ufuncs allocate buffers to broadcast.
+        shape = (len(self.satellites), len(rules))
+        signs = np.array([1.0 if 'above' in rule else -1.0 for rule in rules])
+        self.signs = np.tile(signs, (shape[0], 1))
+        self.raise_levels = np.tile(signs * np.array([rule['above'] if 'above' in rule else rule['below']
+                                                      for rule in rules]), (shape[0], 1))
+        self.clear_levels = np.tile(signs * np.array([rule['clear'] for rule in rules]), (shape[0], 1))
+        # Newest sample of every satellite, NaN until one is ingested
+        self.values = np.full((len(self.satellites), len(METRICS)), np.nan)
+        # Work arrays of evaluate, so that a pass over a large fleet allocates nothing
+        self.levels = np.empty(shape)
+        self.raised = np.empty(shape, dtype=bool)
+        self.cleared = np.empty(shape, dtype=bool)
+        self.lock = threading.Lock()
+
+        if state is None:
+            state = np.zeros(1, dtype=alert_dtype(len(self.satellites), len(rules)))
+        self.counter = state['version']
+        self.active = state['active'][0]
+        self.since = state['since'][0]
+
+    @classmethod
+    def load(cls, path, satellites, state=None):
+        with open(path) as file:
+            return cls(json.load(file)['rules'], satellites, state)
+
+    # Changes whenever an alert is raised or cleared
+    @property
+    def version(self):
+        return int(self.counter[0])
+
+    # Keep the newest sample of a satellite for the next evaluation
+    def stage(self, satellite, row):
+        i = self.index.get(satellite)
+        if i is not None:
+            self.values[i] = row[:len(METRICS)]
+
+    # Forget a satellite nobody watches anymore, its alerts are cleared
+    def reset(self, satellite):
+        i = self.index.get(satellite)
+        if i is None:
+            return
+        with self.lock:
+            self.values[i] = np.nan
+            if self.active[i].any():
+                self.active[i] = False
+                self.counter[0] += 1
+
+    # Raise and clear the alerts of every satellite and rule in one pass over the staged samples. Satellites
+    # without a sample keep their alerts.
+    def evaluate(self):
+        with self.lock:
+            # Columns are valid, 'clip' spares the copy take makes to check them
+            np.take(self.values, self.columns, axis=1, out=self.levels, mode='clip')
+            np.multiply(self.levels, self.signs, out=self.levels)
+            np.greater(self.levels, self.raise_levels, out=self.raised)
+            np.less_equal(self.levels, self.clear_levels, out=self.cleared)
+            # Alerts raised that weren't active (raised > active on booleans), and active ones cleared
+            np.greater(self.raised, self.active, out=self.raised)
+            self.cleared &= self.active
+            if self.raised.any() or self.cleared.any():
+                self.since[self.raised] = time.time()
+                self.active |= self.raised
+                self.active ^= self.cleared
+                self.counter[0] += 1
+
+    # Names of the rules active on a satellite
+    def satellite_alerts(self, satellite):
+        return [self.rules[j]['name'] for j in np.flatnonzero(self.active[self.index[satellite]])]
+
+    # Every active alert of the fleet, newest first
+    def active_alerts(self):
+        satellites, rules = np.nonzero(self.active)
+        alerts = [{'satellite': self.satellites[i], 'rule': self.rules[j]['name'],
+                   'message': self.rules[j]['message'], 'since': float(self.since[i, j])}
+                  for i, j in zip(satellites, rules)]
+        return sorted(alerts, key=lambda alert: -alert['since'])
+
+    # indicator component id -> names of the rules shown on it
+    def indicators(self):
+        indicators = {}
+        for rule in self.rules:
+            if rule.get('indicator'):
+                indicators.setdefault(rule['indicator'], []).append(rule['name'])
+        return indicators
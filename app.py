@@ -1,36 +1,104 @@
 import random
+import functools
 import json
+import os
 import time
-import pandas as pd
+import zlib
 import dash
+import flask
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import State, Input, Output
+from dash.dependencies import State, Input, Output, ClientsideFunction
 import dash_daq as daq
+import numpy as np
+
+from alerts import AlertEngine, alert_dtype
+from callback_metrics import CallbackMetrics
+from compression import ResponseCompression
+from datasets import DatasetCache
+from figure_cache import FigureCache
+from freshness import FreshnessTracker
+from downsample import downsample
+from geodesic import densify, split_antimeridian
+from ingest import IngestServer
+from orbit import OrbitTracks
+from satellites import SatelliteRegistry
+from serializer import dumps, fragment
+from shared_telemetry import SharedTelemetryStore, SharedSource, block_dtype, map_file
+from telemetry import TelemetryStore, ReplaySource
+
+# Time between two telemetry samples, in milliseconds
+UPDATE_INTERVAL = 2000
+
+# Samples kept per satellite and resolution, and the most points the histogram draws (about one per pixel),
+# longer histories are downsampled with DOWNSAMPLE_MODE, 'lttb' or 'minmax'
+HISTORY_SAMPLES = int(os.environ.get('HISTORY_SAMPLES', 60))
+GRAPH_POINTS = 400
+DOWNSAMPLE_MODE = os.environ.get('DOWNSAMPLE_MODE', 'lttb')
+
+# Samples of the ground track of one revolution drawn as the satellite path
+PATH_SAMPLES = int(os.environ.get('PATH_SAMPLES', 3600))
+
+# 'replay' plays the recordings on the server clock, 'udp' receives live frames, see ingest.py
+TELEMETRY_SOURCE = os.environ.get('TELEMETRY_SOURCE', 'replay')
+
+# 'split' registers one callback per panel, 'fused' computes every panel in a single callback per tick and
+# 'push' streams new samples to the browser instead of polling
+CALLBACK_MODE = os.environ.get('CALLBACK_MODE', 'split')
+
+# Directory (preferably a tmpfs such as /dev/shm) of a file holding the telemetry shared by every process of
+# the app, e.g. gunicorn workers. Each process keeps its own telemetry when empty.
+SHARED_TELEMETRY = os.environ.get('SHARED_TELEMETRY', '')
+
+# Encodings callback and layout responses may be compressed with, in order of preference (empty to turn
+# compression off), the smallest response worth compressing in bytes and the compression levels
+RESPONSE_COMPRESSION = [encoding for encoding in os.environ.get('RESPONSE_COMPRESSION', 'br,gzip').split(',')
+                        if encoding]
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_LEVEL = int(os.environ.get('BROTLI_LEVEL', 5))
+
+# Route serving the metrics of the server callbacks in the Prometheus text format, e.g. /metrics. Callbacks
+# aren't instrumented when empty.
+CALLBACK_METRICS = os.environ.get('CALLBACK_METRICS', '')
+
+# Show next to the clock how long ago the displayed telemetry reached the server, 1 to turn it on
+FRESHNESS_INDICATOR = bool(int(os.environ.get('FRESHNESS_INDICATOR', 0)))
+
+# Satellites to choose from, adding one only needs a new entry in this file
+registry = SatelliteRegistry.load(os.environ.get('SATELLITE_REGISTRY', './data/satellites.json'))
+
+# Threshold rules evaluated on the telemetry of the whole fleet as it arrives, see alerts.py, and the most
+# alerts the alert list shows
+ALERT_RULES = os.environ.get('ALERT_RULES', './data/alerts.json')
+ALERT_LIST_SIZE = 50
+
+# Control panel indicators alert rules can light up, the others keep their color
+ALERT_INDICATORS = ['control-panel-solar-panel-0', 'control-panel-solar-panel-1', 'control-panel-camera',
+                    'control-panel-thrusters', 'control-panel-motor']
 
 app = dash.Dash(__name__)
 
 # This is for gunicorn
 server = app.server
 
+ResponseCompression(server,
+                    [app.config.routes_pathname_prefix + path for path in ['_dash-update-component', '_dash-layout']],
+                    encodings=RESPONSE_COMPRESSION, min_size=COMPRESSION_MIN_SIZE,
+                    gzip_level=GZIP_LEVEL, brotli_level=BROTLI_LEVEL)
+
+# Registered after the compression so that it sees responses before they are compressed
+callback_metrics = CallbackMetrics(app, path=CALLBACK_METRICS) if CALLBACK_METRICS else None
+
 ##############################################################################################################
 # Side panel
 ##############################################################################################################
 
 satellite_dropdown = dcc.Dropdown(
     id='satellite-dropdown-component',
-    options=[
-        {
-            'label': 'H45-K1',
-            'value': 'h45-k1'
-        },
-        {
-            'label': 'L12-5',
-            'value': 'l12-5'
-        },
-    ],
+    options=registry.options(),
     clearable=False,
-    value='h45-k1'
+    value=registry.ids()[0]
 )
 
 satellite_dropdown_text = html.P(
@@ -62,6 +130,13 @@ side_panel_layout = html.Div(
                 satellite_title,
                 satellite_body
             ]
+        ),
+        html.Div(
+            id='panel-side-alerts',
+            children=[
+                html.P(id='alert-list-title', children=['Fleet alerts']),
+                html.Ul(id='alert-list')
+            ]
         )
     ]
 )
@@ -71,15 +146,6 @@ side_panel_layout = html.Div(
 # Satellite location tracker
 ##############################################################################################################
 
-# Helper to straighten lines on the map
-def flatten_path(xy1, xy2):
-    diff_rate = (xy2 - xy1) / 100
-    res_list = []
-    for i in range(100):
-        res_list.append(xy1 + i * diff_rate)
-    return res_list
-
-
 map_data = [
     {
         'type': 'scattergeo',
@@ -198,6 +264,19 @@ utc = html.Div(
     n_clicks=0
 )
 
+freshness = html.Div(
+    id='control-panel-freshness',
+    children=[
+        daq.LEDDisplay(
+            id='control-panel-freshness-component',
+            value='0.0',
+            label='Data age (s)',
+            size=50,
+            color='#ffe102',
+        )
+    ]
+)
+
 speed = html.Div(
     id='control-panel-speed',
     children=[
@@ -418,7 +497,7 @@ main_panel_layout = html.Div(
     children=[
         dcc.Interval(
             id='interval',
-            interval=1 * 2000,
+            interval=UPDATE_INTERVAL,
             n_intervals=0
         ),
         html.Div(
@@ -445,7 +524,7 @@ main_panel_layout = html.Div(
                         temperature,
                         speed,
                         utc,
-                    ]
+                    ] + ([freshness] if FRESHNESS_INDICATOR else [])
                 ),
                 html.Div(
                     id='panel-lower-1',
@@ -501,23 +580,54 @@ main_panel_layout = html.Div(
 # Data generation
 ##############################################################################################################
 
-# Pandas
-df_non_gps_h = pd.read_csv('./data/non_gps_data_h.csv')
-df_non_gps_m = pd.read_csv('./data/non_gps_data_m.csv')
-df_gps_m = pd.read_csv('./data/gps_data_m.csv')
-df_gps_h = pd.read_csv('./data/gps_data_h.csv')
-
-# Satellite H45-K1 data
-df_non_gps_h_0 = pd.read_csv('./data/non_gps_data_h_0.csv')
-df_non_gps_m_0 = pd.read_csv('./data/non_gps_data_m_0.csv')
-df_gps_m_0 = pd.read_csv('./data/gps_data_m_0.csv')
-df_gps_h_0 = pd.read_csv('./data/gps_data_h_0.csv')
-
-# Satellite L12-5 data
-df_non_gps_h_1 = pd.read_csv('./data/non_gps_data_h_1.csv')
-df_non_gps_m_1 = pd.read_csv('./data/non_gps_data_m_1.csv')
-df_gps_m_1 = pd.read_csv('./data/gps_data_m_1.csv')
-df_gps_h_1 = pd.read_csv('./data/gps_data_h_1.csv')
+# Recordings are only loaded once a satellite is viewed
+datasets = DatasetCache(registry.data_paths(),
+                        max_bytes=int(os.environ.get('DATASET_CACHE_BYTES', 256 * 1024 * 1024)))
+
+# Positions and ground tracks of the satellites with orbital elements in the registry
+orbits = OrbitTracks(registry.orbits(), samples=PATH_SAMPLES)
+
+# Telemetry lives on the server, the browser only receives the values it renders. Alerts are evaluated where
+# the telemetry is ingested, in the writer process when it is shared.
+if SHARED_TELEMETRY:
+    # Processes of the same app with the same file layout (history length included) share a file
+    shared_key = zlib.crc32(json.dumps([registry.ids(), str(block_dtype(HISTORY_SAMPLES))]).encode('utf-8'))
+    with open(ALERT_RULES) as file:
+        alert_rules = json.load(file)['rules']
+    alerts_key = zlib.crc32(json.dumps([registry.ids(), alert_rules]).encode('utf-8'))
+    alert_engine = AlertEngine(alert_rules, registry.ids(), state=map_file(
+        os.path.join(SHARED_TELEMETRY, 'satellite-alerts-{:08x}.shm'.format(alerts_key)),
+        alert_dtype(len(registry), len(alert_rules)), 1))
+    telemetry_store = SharedTelemetryStore(
+        os.path.join(SHARED_TELEMETRY, 'satellite-telemetry-{:08x}.shm'.format(shared_key)),
+        registry.ids(), capacity=HISTORY_SAMPLES, alerts=alert_engine)
+else:
+    alert_engine = AlertEngine.load(ALERT_RULES, registry.ids())
+    telemetry_store = TelemetryStore(capacity=HISTORY_SAMPLES, alerts=alert_engine)
+if TELEMETRY_SOURCE == 'udp':
+    telemetry_source = IngestServer(telemetry_store, registry,
+                                    host=os.environ.get('INGEST_HOST', '127.0.0.1'),
+                                    port=int(os.environ.get('INGEST_PORT', 5005)))
+else:
+    telemetry_source = ReplaySource(telemetry_store, datasets, orbits, period=UPDATE_INTERVAL / 1000)
+if SHARED_TELEMETRY:
+    # Only the process elected writer runs the source
+    telemetry_source = SharedSource(telemetry_source, telemetry_store, period=UPDATE_INTERVAL / 1000)
+
+# Sample-to-screen latency browsers report, served with the callback metrics
+freshness_tracker = FreshnessTracker()
+if callback_metrics is not None:
+    callback_metrics.add_collector(freshness_tracker.lines)
+
+# Figures of the views clients are looking at, built once per new data
+figure_cache = FigureCache(max_entries=int(os.environ.get('FIGURE_CACHE_ENTRIES', 512)))
+if callback_metrics is not None:
+    callback_metrics.add_metric('figure_cache_hits_total', 'counter', 'Figures served from the cache.',
+                                lambda: figure_cache.hits)
+    callback_metrics.add_metric('figure_cache_misses_total', 'counter', 'Figures built on a cache miss.',
+                                lambda: figure_cache.misses)
+    callback_metrics.add_metric('figure_cache_entries', 'gauge', 'Figures in the cache.',
+                                lambda: len(figure_cache.entries))
 
 ##############################################################################################################
 # Root
@@ -526,67 +636,19 @@ root_layout = html.Div(
     id='root',
     children=[
         dcc.Store(id='store-placeholder'),
-        dcc.Store(id='store-data', data={
-            'hour_data': {
-                'elevation': [df_non_gps_h['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_h['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_h['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_h['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_h['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_h['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_h['battery'][i] for i in range(60)],
-            },
-            'minute_data': {
-                'elevation': [df_non_gps_m['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_m['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_m['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_m['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_m['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_m['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_m['battery'][i] for i in range(60)],
-            },
-            'hour_data_0': {
-                'elevation': [df_non_gps_h_0['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_h_0['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_h_0['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_h_0['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_h_0['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_h_0['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_h_0['battery'][i] for i in range(60)],
-            },
-            'minute_data_0': {
-                'elevation': [df_non_gps_m_0['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_m_0['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_m_0['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_m_0['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_m_0['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_m_0['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_m_0['battery'][i] for i in range(60)],
-            },
-            'hour_data_1': {
-                'elevation': [df_non_gps_h_1['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_h_1['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_h_1['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_h_1['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_h_1['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_h_1['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_h_1['battery'][i] for i in range(60)],
-            },
-            'minute_data_1': {
-                'elevation': [df_non_gps_m_1['elevation'][i] for i in range(60)],
-                'temperature': [df_non_gps_m_1['temperature'][i] for i in range(60)],
-                'speed': [df_non_gps_m_1['speed'][i] for i in range(60)],
-                'latitude': ['{0:09.4f}'.format(df_gps_m_1['lat'][i]) for i in range(60)],
-                'longitude': ['{0:09.4f}'.format(df_gps_m_1['lon'][i]) for i in range(60)],
-                'fuel': [df_non_gps_m_1['fuel'][i] for i in range(60)],
-                'battery': [df_non_gps_m_1['battery'][i] for i in range(60)],
-            }
-
-        }),
+        # Latest telemetry of the selected satellite
+        dcc.Store(id='store-data'),
+        # Sample-to-screen latency of the telemetry rendered last, reported to the server on the next tick
+        dcc.Store(id='store-freshness'),
+        # Rule names shown on each alert indicator, and the alert version the alert list was last built for
+        dcc.Store(id='store-alert-indicators', data=[[indicator, alert_engine.indicators().get(indicator, [])]
+                                                     for indicator in ALERT_INDICATORS]),
+        dcc.Store(id='store-alerts-version'),
+        # Push mode: set when the browser missed samples, the histogram is then sent whole again
+        dcc.Store(id='store-graph-resync'),
         # For the case no components were clicked, we need to know what type of graph to preserve
         dcc.Store(id='store-data-config', data={
             'info_type': '',
-            'satellite_type': '',
         }),
         side_panel_layout,
         main_panel_layout
@@ -600,62 +662,23 @@ app.layout = root_layout
 # Callbacks Data
 ##############################################################################################################
 
-# Add new data every second/minute
-@app.callback(
-    Output('store-data', 'data'),
-    [Input('interval', 'n_intervals')],
-    [State('store-data', 'data')]
-)
-def update_data(interval, data):
-    new_data = data
-    # Update H45-K1 data when sat==0, update L12-5 data when sat==1
-    for sat in range(2):
-        if sat == 0:
-            gps_minute_file = df_gps_m_0
-            gps_hour_file = df_gps_h_0
-        else:
-            gps_minute_file = df_gps_m_1
-            gps_hour_file = df_gps_h_1
-
-        m_data_key = 'minute_data_' + str(sat)
-        h_data_key = 'hour_data_' + str(sat)
-
-        new_data[m_data_key]['elevation'].append(data[m_data_key]['elevation'][0])
-        new_data[m_data_key]['elevation'] = new_data[m_data_key]['elevation'][1:61]
-        new_data[m_data_key]['temperature'].append(data[m_data_key]['temperature'][0])
-        new_data[m_data_key]['temperature'] = new_data[m_data_key]['temperature'][1:61]
-        new_data[m_data_key]['speed'].append(data[m_data_key]['speed'][0])
-        new_data[m_data_key]['speed'] = new_data[m_data_key]['speed'][1:61]
-        new_data[m_data_key]['latitude'].append(
-            '{0:09.4f}'.format(gps_minute_file['lat'][(60 + interval) % 3600]))
-        new_data[m_data_key]['latitude'] = new_data[m_data_key]['latitude'][1:61]
-        new_data[m_data_key]['longitude'].append(
-            '{0:09.4f}'.format(gps_minute_file['lon'][(60 + interval) % 3600]))
-        new_data[m_data_key]['longitude'] = new_data[m_data_key]['longitude'][1:61]
-
-        new_data[m_data_key]['fuel'].append(data[m_data_key]['fuel'][0])
-        new_data[m_data_key]['fuel'] = new_data[m_data_key]['fuel'][1:61]
-        new_data[m_data_key]['battery'].append(data[m_data_key]['battery'][0])
-        new_data[m_data_key]['battery'] = new_data['minute_data_0']['battery'][1:61]
-
-        if interval % 60000 == 0:
-            new_data[h_data_key]['elevation'].append(data[h_data_key]['elevation'][0])
-            new_data[h_data_key]['elevation'] = new_data[h_data_key]['elevation'][1:61]
-            new_data[h_data_key]['temperature'].append(data[h_data_key]['temperature'][0])
-            new_data[h_data_key]['temperature'] = new_data[h_data_key]['temperature'][1:61]
-            new_data[h_data_key]['speed'].append(data[h_data_key]['speed'][0])
-            new_data[h_data_key]['speed'] = new_data[h_data_key]['speed'][1:61]
-            new_data[h_data_key]['latitude'].append(
-                '{0:09.4f}'.format(gps_hour_file['lat'][interval % 60]))
-            new_data[h_data_key]['latitude'] = new_data[h_data_key]['latitude'][1:61]
-            new_data[h_data_key]['longitude'].append(
-                '{0:09.4f}'.format(gps_hour_file['lon'][interval % 60]))
-            new_data[h_data_key]['longitude'] = new_data[h_data_key]['longitude'][1:61]
-            new_data[h_data_key]['fuel'].append(data[h_data_key]['fuel'][0])
-            new_data[h_data_key]['fuel'] = new_data[h_data_key]['fuel'][1:61]
-            new_data[h_data_key]['battery'].append(data[h_data_key]['battery'][0])
-            new_data[h_data_key]['battery'] = new_data[h_data_key]['battery']
+# Latest values of the selected satellite, sent to the browser on every tick with when the sample reached the
+# server and when it was sent (see update_freshness in assets/clientside.js), and its active alerts
+def build_data(satellite_type):
+    new_data = telemetry_store.latest(satellite_type)
+    new_data['satellite'] = satellite_type
+    new_data['served'] = time.time()
+    new_data['alerts'] = alert_engine.satellite_alerts(satellite_type)
+    new_data['alerts_version'] = alert_engine.version
+    return new_data
+
 
+# Latest values pushed to the browser, with what it needs to extend the graphs by itself
+def build_push_data(satellite_type):
+    new_data = build_data(satellite_type)
+    new_data['count'] = telemetry_store.count(satellite_type)
+    new_data['hour'] = telemetry_store.latest(satellite_type, 'hour')
+    new_data['hour_count'] = telemetry_store.count(satellite_type, 'hour')
     return new_data
 
 
@@ -663,46 +686,13 @@ def update_data(interval, data):
 # Callbacks Histogram
 ##############################################################################################################
 
-# Update the graph
-@app.callback(
-    [Output('graph-panel', 'figure'),
-     Output('store-data-config', 'data')],
-    [Input('interval', 'n_intervals'),
-     Input('satellite-dropdown-component', 'value'),
-     Input('control-panel-toggle-minute', 'value'),
-     Input('control-panel-elevation', 'n_clicks'),
-     Input('control-panel-temperature', 'n_clicks'),
-     Input('control-panel-speed', 'n_clicks'),
-     Input('control-panel-latitude', 'n_clicks'),
-     Input('control-panel-longitude', 'n_clicks'),
-     Input('control-panel-fuel', 'n_clicks'),
-     Input('control-panel-battery', 'n_clicks')],
-    [State('store-data', 'data'),
-     State('store-data-config', 'data')]
-)
-def update_graph(interval, satellite_type, minute_mode,
-                 elevation_n_clicks, temperature_n_clicks, speed_n_clicks,
-                 latitude_n_clicks, longitude_n_clicks, fuel_n_clicks,
-                 battery_n_clicks, data,
-                 data_config):
-    # Used to check stuff
-    new_data_config = data_config
-    info_type = data_config['info_type']
-    ctx = dash.callback_context
+graph_components = ['elevation', 'temperature', 'speed', 'latitude', 'longitude', 'fuel', 'battery']
 
-    # Check which input fired off the component
-    if not ctx.triggered:
-        trigger_input = ''
-    else:
-        trigger_input = ctx.triggered[0]['prop_id'].split('.')[0]
 
-    # Update store-data-config['satellite_type']
-    if satellite_type == 'h45-k1':
-        new_data_config['satellite_type'] = 0
-    elif satellite_type == 'l12-5':
-        new_data_config['satellite_type'] = 1
-    else:
-        new_data_config['satellite_type'] = None
+# Histogram figure of a view, with the data it was built from. Figures are built once per view and sample
+# count, every client showing the view shares them, see figure_cache.
+def build_graph_figure(satellite_type, resolution, data_key):
+    minute_mode = resolution == 'minute'
 
     # Decide the range of Y given if minute_mode is on
     def set_y_range(data_key):
@@ -768,7 +758,7 @@ def update_graph(interval, satellite_type, minute_mode,
             else:
                 figure['layout']['yaxis'] = {
                     'rangemode': 'normal',
-                    'range': [0, 360],
+                    'range': [-180, 180],
                     'autorange': False,
                 }
 
@@ -785,23 +775,6 @@ def update_graph(interval, satellite_type, minute_mode,
                     'autorange': False
                 }
 
-    # Function to update values
-    def update_graph_data(data_key):
-        string_buffer = ''
-        if data_config['satellite_type'] == 0:
-            string_buffer = '_0'
-        elif data_config['satellite_type'] == 1:
-            string_buffer = '_1'
-
-        if minute_mode:
-            figure['data'][0]['y'] = list(reversed(data['minute_data' + string_buffer][data_key]))
-        else:
-            figure['data'][0]['y'] = list(reversed(data['hour_data' + string_buffer][data_key]))
-
-        # Graph title changes depending on graphed data
-        figure['layout']['title'] = data_key.capitalize() + ' Histogram'
-        return data_key
-
     # A default figure option to base off everything else from
     figure = {
         'data': [{
@@ -837,47 +810,65 @@ def update_graph(interval, satellite_type, minute_mode,
         }
     }
 
-    # First pass checks if a component has been selected
-    if trigger_input == 'control-panel-elevation':
-        set_y_range('elevation')
-        info_type = update_graph_data('elevation')
+    set_y_range(data_key)
+    count, values = telemetry_store.snapshot(satellite_type, data_key, resolution)
+    x, y = downsample(np.arange(count - len(values), count), values, GRAPH_POINTS, DOWNSAMPLE_MODE)
+    figure['data'][0]['x'] = x
+    figure['data'][0]['y'] = y
+    if len(values) > 60:
+        del figure['layout']['xaxis']['dtick']
 
-    elif trigger_input == 'control-panel-temperature':
-        set_y_range('temperature')
-        info_type = update_graph_data('temperature')
+    # Graph title changes depending on graphed data
+    figure['layout']['title'] = data_key.capitalize() + ' Histogram'
+    return {'count': count, 'values': values, 'figure': fragment(figure), 'points': len(y),
+            'downsampled': len(values) > GRAPH_POINTS}
 
-    elif trigger_input == 'control-panel-speed':
-        set_y_range('speed')
-        info_type = update_graph_data('speed')
 
-    elif trigger_input == 'control-panel-latitude':
-        set_y_range('latitude')
-        info_type = update_graph_data('latitude')
-
-    elif trigger_input == 'control-panel-longitude':
-        set_y_range('longitude')
-        info_type = update_graph_data('longitude')
-
-    elif trigger_input == 'control-panel-fuel':
-        set_y_range('fuel')
-        info_type = update_graph_data('fuel')
-
-    elif trigger_input == 'control-panel-battery':
-        set_y_range('battery')
-        info_type = update_graph_data('battery')
+# Build the histogram for whichever input fired. A full figure is only sent when the view changes, new
+# samples are appended through extendData and nothing is sent when the graph would not change.
+def build_graph(trigger_input, satellite_type, minute_mode, data_config, incremental=True):
+    # Used to check stuff
+    new_data_config = data_config
+    info_type = data_config['info_type']
 
+    # First pass checks if a component has been selected
+    if trigger_input.replace('control-panel-', '') in graph_components:
+        info_type = trigger_input.replace('control-panel-', '')
+        data_key = info_type
     # If no component has been selected, check for most recent info_type, to prevent graph from always resetting
+    elif info_type in graph_components:
+        data_key = info_type
     else:
-        if info_type in ['elevation', 'temperature', 'speed', 'latitude', 'longitude', 'fuel', 'battery']:
-            set_y_range(info_type)
-            update_graph_data(info_type)
-        else:
-            set_y_range('elevation')
-            update_graph_data('elevation')
-        return [figure, new_data_config]
-    # Update store-data-config['info_type']
+        data_key = 'elevation'
+
+    resolution = 'minute' if minute_mode else 'hour'
+    view = [satellite_type, resolution, data_key]
+    graph = figure_cache.get(('graph',) + tuple(view), telemetry_store.count(satellite_type, resolution),
+                             lambda: build_graph_figure(satellite_type, resolution, data_key))
+    count, values = graph['count'], graph['values']
+
+    # While the same view is shown, only the samples the browser doesn't have yet are sent. Downsampled
+    # series are always sent whole, appending raw samples would skew their time span. A browser ahead of the
+    # server (restarted, or another worker's telemetry) gets the whole figure too.
+    version = data_config.get('version')
+    incremental = incremental and not graph['downsampled']
+    if incremental and version is not None and version[:3] == view and 0 <= count - version[3] < len(values):
+        if count == version[3]:
+            return [dash.no_update, dash.no_update, dash.no_update]
+        new_samples = count - version[3]
+        extend_data = [{
+            'x': [np.arange(version[3], count)],
+            'y': [values[-new_samples:]],
+        }, [0], len(values)]
+        new_data_config['version'] = view + [count]
+        return [dash.no_update, extend_data, new_data_config]
+
+    # Update store-data-config
     new_data_config['info_type'] = info_type
-    return [figure, new_data_config]
+    new_data_config['version'] = view + [count]
+    new_data_config['points'] = graph['points']
+    new_data_config['downsampled'] = graph['downsampled']
+    return [graph['figure'], dash.no_update, new_data_config]
 
 
 ##############################################################################################################
@@ -889,10 +880,8 @@ def update_graph(interval, satellite_type, minute_mode,
     [Input('satellite-dropdown-component', 'value')]
 )
 def update_satellite_name(val):
-    if val == 'h45-k1':
-        return 'Satellite\nH45-K1'
-    elif val == 'l12-5':
-        return 'Satellite\nL12-5'
+    if val in registry:
+        return 'Satellite\n' + registry[val]['label']
     else:
         return ''
 
@@ -905,24 +894,8 @@ def update_satellite_description(val):
 
     text = 'Select a satellite to view using the dropdown above.'
 
-    if val == 'h45-k1':
-        text = 'H45-K1, also known as GPS IIR-9 and GPS SVN-45, is an American navigation satellite which forms part ' \
-               'of the Global Positioning System. It was the ninth Block IIR GPS satellite to be launched, out of ' \
-               'thirteen in the original configuration, and twenty one overall. It was built by Lockheed Martin, using ' \
-               'the AS-4000 satellite bus. -168 was launched at 22:09:01 UTC on 31 March 2003, atop a Delta II carrier ' \
-               'rocket, flight number D297, flying in the 7925-9.5 configuration. The launch took place from Space ' \
-               'Launch Complex 17A at the Cape Canaveral Air Force Station, and placed H45-K1 into a transfer orbit. ' \
-               'The satellite raised itself into medium Earth orbit using a Star-37FM apogee motor.'
-
-    elif val == 'l12-5':
-        text = 'L12-5, also known as NRO Launch 22 or NROL-22, is an American signals intelligence satellite, ' \
-               'operated by the National Reconnaissance Office. Launched in 2006, it has been identified as the first ' \
-               'in a new series of satellites which are replacing the earlier Trumpet spacecraft. L12-5 was launched ' \
-               'by Boeing, using a Delta IV carrier rocket flying in the Medium+(4,2) configuration. The rocket was the ' \
-               'first Delta IV to launch from Vandenberg Air Force Base, flying from Space Launch Complex 6, a launch ' \
-               'pad originally constructed as part of abandoned plans for manned launches from Vandenberg, originally ' \
-               'using Titan rockets, and later Space Shuttles. The launch also marked the first launch of an Evolved ' \
-               'Expendable Launch Vehicle from Vandenberg, and the first launch of an NRO payload on an EELV.'
+    if val in registry:
+        text = registry[val]['description']
     return text
 
 
@@ -930,151 +903,349 @@ def update_satellite_description(val):
 # Callbacks Map
 ##############################################################################################################
 
-@app.callback(
-    Output('world-map', 'figure'),
-    [Input('interval', 'n_intervals'),
-     Input('control-panel-toggle-map', 'value'),
-     Input('satellite-dropdown-component', 'value')],
-    [State('world-map', 'figure'),
-     State('store-data', 'data'),
-     State('store-data-config', 'data')]
-)
-def update_word_map(clicks, toggle, satellite_type, old_figure, data, data_config):
-    figure = old_figure
-    string_buffer = ''
-
-    # Set string buffer as well as drawing the satellite path
-    if data_config['satellite_type'] == 0:
-        string_buffer = '_0'
-        figure['data'][0]['lat'] = [df_gps_m_0['lat'][i] for i in range(3600)]
-        figure['data'][0]['lon'] = [df_gps_m_0['lon'][i] for i in range(3600)]
-
-    elif data_config['satellite_type'] == 1:
-        string_buffer = '_1'
-        figure['data'][0]['lat'] = [df_gps_m_1['lat'][i] for i in range(3600)]
-        figure['data'][0]['lon'] = [df_gps_m_1['lon'][i] for i in range(3600)]
+# The path is the ground track of the current revolution, so its trace is only built and encoded once per
+# satellite and revolution. Satellites without orbital elements draw their recorded track.
+@functools.lru_cache(maxsize=32)
+def path_trace(satellite_type, window):
+    if satellite_type in orbits:
+        latitude, longitude = orbits.track(satellite_type, window)
     else:
-        figure['data'][0]['lat'] = [df_gps_m['lat'][i] for i in range(3600)]
-        figure['data'][0]['lon'] = [df_gps_m['lon'][i] for i in range(3600)]
+        path = datasets.get(satellite_type)['minute']
+        latitude, longitude = path['latitude'][:PATH_SAMPLES], path['longitude'][:PATH_SAMPLES]
+    trace = dict(map_data[0])
+    # Downsampled to about one point per pixel of the map, then drawn along great circles and cut at the
+    # antimeridian
+    lon, lat = downsample(longitude, latitude, map_layout['width'])
+    lat, lon = split_antimeridian(*densify(lat, lon))
+    trace['lat'] = lat
+    trace['lon'] = lon
+    return fragment(trace)
+
+
+# extendData moving the current position marker
+def build_marker(satellite_type):
+    position = telemetry_store.latest(satellite_type)
+    return [{
+        'lat': [[position['latitude']]],
+        'lon': [[position['longitude']]],
+    }, [1], 1]
+
+
+# Whole map, the path comes encoded from path_trace and only the marker is built for each request
+def build_map_figure(satellite_type, path):
+    position = telemetry_store.latest(satellite_type)
+    marker = dict(map_data[1])
+    marker['lat'] = [position['latitude']]
+    marker['lon'] = [position['longitude']]
+    return {
+        'data': [path, marker],
+        'layout': map_layout
+    }
+
 
-    if clicks % 2 == 0:
-        figure['data'][1]['lat'] = [float(data['minute_data' + string_buffer]['latitude'][-1])]
-        figure['data'][1]['lon'] = [float(data['minute_data' + string_buffer]['longitude'][-1])]
+# Build the map for whichever input fired. Ticks only move the current position marker through extendData,
+# the whole figure is sent when the satellite or the path toggle changes. The marker is shared by the clients
+# showing the same satellite (see figure_cache), and so is the path of the whole figure.
+def build_map(trigger_input, clicks, toggle, satellite_type):
+    count = telemetry_store.count(satellite_type)
+
+    if trigger_input == 'interval':
+        # The marker only moves every other tick
+        if clicks % 2 != 0:
+            return [dash.no_update, dash.no_update]
+        extend_data = figure_cache.get(('marker', satellite_type), count,
+                                       lambda: fragment(build_marker(satellite_type)))
+        return [dash.no_update, extend_data]
 
     # If toggle is off, hide path
-    if not toggle:
-        figure['data'][0]['lat'] = []
-        figure['data'][0]['lon'] = []
-    return figure
+    if toggle:
+        window = orbits.window(satellite_type, time.time()) if satellite_type in orbits else 0
+        path = path_trace(satellite_type, window)
+    else:
+        path = dict(map_data[0], lat=[], lon=[])
+    return [build_map_figure(satellite_type, path), dash.no_update]
 
 
 ##############################################################################################################
 # Callbacks Components
 ##############################################################################################################
 
-@app.callback(
+# The panel widgets only format values already in the browser, see assets/clientside.js
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_time'),
     Output('control-panel-utc-component', 'value'),
-    [Input('interval', 'n_intervals')],
+    [Input('interval', 'n_intervals')]
 )
-def update_time(interval):
-    hour = time.localtime(time.time())[3]
-    hour = str(hour).zfill(2)
-
-    minute = time.localtime(time.time())[4]
-    minute = str(minute).zfill(2)
-    return hour + ':' + minute
 
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_non_gps_component'),
     [Output('control-panel-elevation-component', 'value'),
      Output('control-panel-temperature-component', 'value'),
      Output('control-panel-speed-component', 'value'),
      Output('control-panel-fuel-component', 'value'),
      Output('control-panel-battery-component', 'value')],
-    [Input('interval', 'n_intervals'),
-     Input('satellite-dropdown-component', 'value')],
-    [State('store-data-config', 'data'),
-     State('store-data', 'data')]
+    [Input('store-data', 'data')]
 )
-def update_non_gps_component(clicks, satellite_type, data_config, data):
-    string_buffer = ''
-    if data_config['satellite_type'] == 0:
-        string_buffer = '_0'
-    if data_config['satellite_type'] == 1:
-        string_buffer = '_1'
 
-    new_data = []
-    components_list = ['elevation', 'temperature', 'speed', 'fuel', 'battery']
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_gps_component'),
+    [Output('control-panel-latitude-component', 'value'),
+     Output('control-panel-longitude-component', 'value')],
+    [Input('store-data', 'data')]
+)
 
-    # Update each graph value
-    for component in components_list:
-        new_data.append(data['minute_data' + string_buffer][component][-1])
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_gps_color'),
+    [Output('control-panel-latitude-component', 'color'),
+     Output('control-panel-longitude-component', 'color')],
+    [Input('store-data', 'data')]
+)
 
-    return new_data
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_freshness'),
+    Output('store-freshness', 'data'),
+    [Input('store-data', 'data')]
+)
 
+if FRESHNESS_INDICATOR:
+    app.clientside_callback(
+        ClientsideFunction(namespace='clientside', function_name='update_freshness_component'),
+        Output('control-panel-freshness-component', 'value'),
+        [Input('store-freshness', 'data')]
+    )
 
-@app.callback(
-    [Output('control-panel-latitude-component', 'value'),
-     Output('control-panel-longitude-component', 'value')],
-    [Input('interval', 'n_intervals'),
-     Input('satellite-dropdown-component', 'value')],
-    [State('store-data-config', 'data'),
-     State('store-data', 'data')]
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_communication_component'),
+    Output('control-panel-communication-signal', 'value'),
+    [Input('interval', 'n_intervals')]
 )
-def update_gps_component(clicks, satellite_type, data_config, data):
-    string_buffer = ''
-    if data_config['satellite_type'] == 0:
-        string_buffer = '_0'
-    if data_config['satellite_type'] == 1:
-        string_buffer = '_1'
-
-    new_data = []
-    for component in ['latitude', 'longitude']:
-        val = list(data['minute_data' + string_buffer][component][-1])
-        if val[0] == '-':
-            new_data.append('0' + ''.join(val[1::]))
-        else:
-            new_data.append(''.join(val))
-    return new_data
 
 
-@app.callback(
-    [Output('control-panel-latitude-component', 'color'),
-     Output('control-panel-longitude-component', 'color')],
-    [Input('interval', 'n_intervals'),
-     Input('satellite-dropdown-component', 'value')],
-    [State('store-data-config', 'data'),
-     State('store-data', 'data')]
+##############################################################################################################
+# Callbacks Alerts
+##############################################################################################################
+
+# Alerts are evaluated once per ingested batch for the whole fleet (see alerts.py), the browser colors the
+# indicators from the alerts sent with the data and only asks for the alert list when the alerts changed
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_alert_indicators'),
+    [Output(indicator, 'color') for indicator in ALERT_INDICATORS],
+    [Input('store-data', 'data')],
+    [State('store-alert-indicators', 'data')]
 )
-def update_gps_color(clicks, satellite_type, data_config, data):
-    string_buffer = ''
-    if data_config['satellite_type'] == 0:
-        string_buffer = '_0'
-    if data_config['satellite_type'] == 1:
-        string_buffer = '_1'
-
-    new_data = []
-
-    for component in ['latitude', 'longitude']:
-        value = float(data['minute_data' + string_buffer][component][-1])
-        if value < 0:
-            new_data.append('#ff8e77')
-        else:
-            new_data.append('#ffe102')
 
-    return new_data
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='update_alerts_version'),
+    Output('store-alerts-version', 'data'),
+    [Input('store-data', 'data')],
+    [State('store-alerts-version', 'data')]
+)
 
 
+# Items of the alert list, newest first
+def build_alert_list():
+    alerts = alert_engine.active_alerts()
+    if not alerts:
+        return [html.Li('No active alerts')]
+    items = [html.Li('{} {}: {}'.format(time.strftime('%H:%M', time.gmtime(alert['since'])),
+                                        registry[alert['satellite']]['label'], alert['message']))
+             for alert in alerts[:ALERT_LIST_SIZE]]
+    if len(alerts) > ALERT_LIST_SIZE:
+        items.append(html.Li('and {} more'.format(len(alerts) - ALERT_LIST_SIZE)))
+    return items
+
+
+# Built once per alert version and shared by every client
 @app.callback(
-    Output('control-panel-communication-signal', 'value'),
-    [Input('interval', 'n_intervals'),
-     Input('satellite-dropdown-component', 'value')]
+    Output('alert-list', 'children'),
+    [Input('store-alerts-version', 'data')]
 )
-def update_communication_component(clicks, satellite_type):
-    if clicks % 2 == 0:
-        return False
-    else:
-        return True
+def update_alert_list(version):
+    return figure_cache.get(('alerts',), alert_engine.version, build_alert_list)
+
+
+##############################################################################################################
+# Callbacks Tick
+##############################################################################################################
+
+# Inputs that pick what the histogram shows, shared by all callback modes
+graph_inputs = [
+    Input('control-panel-toggle-minute', 'value'),
+    Input('control-panel-elevation', 'n_clicks'),
+    Input('control-panel-temperature', 'n_clicks'),
+    Input('control-panel-speed', 'n_clicks'),
+    Input('control-panel-latitude', 'n_clicks'),
+    Input('control-panel-longitude', 'n_clicks'),
+    Input('control-panel-fuel', 'n_clicks'),
+    Input('control-panel-battery', 'n_clicks'),
+]
+
+
+# Satellite ids come from the browser, only satellites of the registry are synced and get buffers
+def sync_satellite(satellite_type):
+    if satellite_type not in registry:
+        raise dash.exceptions.PreventUpdate
+    telemetry_source.sync(satellite_type)
+
+
+# Id of the component that fired off the callback
+def get_trigger_input():
+    ctx = dash.callback_context
+    if not ctx.triggered:
+        return ''
+    return ctx.triggered[0]['prop_id'].split('.')[0]
+
+
+# Sample-to-screen latency a browser reports along with its next tick. Other triggers carry the same report
+# again, only record it on ticks.
+def record_freshness(trigger_input, freshness):
+    if trigger_input == 'interval' and isinstance(freshness, dict) and freshness.get('satellite') in registry:
+        freshness_tracker.record(freshness['satellite'], freshness.get('latency'))
+
+
+if CALLBACK_MODE == 'fused':
+    # One request per tick computes the data, the histogram and the map
+    @app.callback(
+        [Output('store-data', 'data'),
+         Output('graph-panel', 'figure'),
+         Output('graph-panel', 'extendData'),
+         Output('store-data-config', 'data'),
+         Output('world-map', 'figure'),
+         Output('world-map', 'extendData')],
+        [Input('interval', 'n_intervals'),
+         Input('satellite-dropdown-component', 'value'),
+         Input('control-panel-toggle-map', 'value')] + graph_inputs,
+        [State('store-data-config', 'data'),
+         State('store-freshness', 'data')]
+    )
+    def update_dashboard(interval, satellite_type, toggle, minute_mode, *args):
+        data_config, freshness = args[-2:]
+        trigger_input = get_trigger_input()
+        record_freshness(trigger_input, freshness)
+        sync_satellite(satellite_type)
+
+        new_data = dash.no_update
+        if trigger_input in ['', 'interval', 'satellite-dropdown-component']:
+            new_data = build_data(satellite_type)
+
+        graph = [dash.no_update, dash.no_update, dash.no_update]
+        if trigger_input != 'control-panel-toggle-map':
+            graph = build_graph(trigger_input, satellite_type, minute_mode, data_config)
+
+        world_map = [dash.no_update, dash.no_update]
+        if trigger_input in ['', 'interval', 'satellite-dropdown-component', 'control-panel-toggle-map']:
+            world_map = build_map(trigger_input, interval, toggle, satellite_type)
+
+        return [new_data] + graph + world_map
+
+elif CALLBACK_MODE == 'push':
+    # The server streams new samples into store-data (see stream_telemetry), the browser appends them to the
+    # graphs itself. Server callbacks only run when the operator changes what is displayed.
+    app.clientside_callback(
+        ClientsideFunction(namespace='clientside', function_name='open_telemetry_stream'),
+        Output('store-placeholder', 'data'),
+        [Input('satellite-dropdown-component', 'value')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='clientside', function_name='push_graphs'),
+        [Output('graph-panel', 'extendData'),
+         Output('world-map', 'extendData'),
+         Output('store-graph-resync', 'data')],
+        [Input('store-data', 'data')],
+        [State('store-data-config', 'data')]
+    )
+
+    @app.callback(
+        [Output('graph-panel', 'figure'),
+         Output('store-data-config', 'data')],
+        [Input('satellite-dropdown-component', 'value'),
+         Input('store-graph-resync', 'data')] + graph_inputs,
+        [State('store-data-config', 'data')]
+    )
+    def update_graph(satellite_type, resync, minute_mode, *args):
+        data_config = args[-1]
+        sync_satellite(satellite_type)
+        figure, _, new_data_config = build_graph(get_trigger_input(), satellite_type, minute_mode, data_config,
+                                                 incremental=False)
+        # Tells the browser which resync request this figure answers
+        new_data_config['resync'] = resync
+        return [figure, new_data_config]
+
+    @app.callback(
+        Output('world-map', 'figure'),
+        [Input('control-panel-toggle-map', 'value'),
+         Input('satellite-dropdown-component', 'value')]
+    )
+    def update_word_map(toggle, satellite_type):
+        sync_satellite(satellite_type)
+        return build_map(get_trigger_input(), 0, toggle, satellite_type)[0]
+
+    @server.route('/telemetry/stream')
+    def stream_telemetry():
+        satellite_type = flask.request.args.get('satellite')
+        if satellite_type not in registry:
+            flask.abort(404)
+
+        def events():
+            count = None
+            last_event = time.time()
+            while True:
+                # Replayed telemetry only advances when synced, live telemetry wakes the wait up right away
+                telemetry_source.sync(satellite_type)
+                new_count = telemetry_store.wait(satellite_type, count, timeout=UPDATE_INTERVAL / 1000)
+                if new_count == count:
+                    # Keeps proxies from closing idle connections, and notices clients that went away
+                    if time.time() - last_event > 15:
+                        last_event = time.time()
+                        yield ': keep-alive\n\n'
+                    continue
+                count = new_count
+                last_event = time.time()
+                yield 'data: ' + dumps(build_push_data(satellite_type)) + '\n\n'
+
+        return flask.Response(events(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+else:
+    # Add new data every second/minute
+    @app.callback(
+        Output('store-data', 'data'),
+        [Input('interval', 'n_intervals'),
+         Input('satellite-dropdown-component', 'value')],
+        [State('store-freshness', 'data')]
+    )
+    def update_data(interval, satellite_type, freshness):
+        record_freshness(get_trigger_input(), freshness)
+        sync_satellite(satellite_type)
+        return build_data(satellite_type)
+
+    # Update the graph
+    @app.callback(
+        [Output('graph-panel', 'figure'),
+         Output('graph-panel', 'extendData'),
+         Output('store-data-config', 'data')],
+        [Input('interval', 'n_intervals'),
+         Input('satellite-dropdown-component', 'value')] + graph_inputs,
+        [State('store-data-config', 'data')]
+    )
+    def update_graph(interval, satellite_type, minute_mode, *args):
+        data_config = args[-1]
+        sync_satellite(satellite_type)
+        return build_graph(get_trigger_input(), satellite_type, minute_mode, data_config)
+
+    @app.callback(
+        [Output('world-map', 'figure'),
+         Output('world-map', 'extendData')],
+        [Input('interval', 'n_intervals'),
+         Input('control-panel-toggle-map', 'value'),
+         Input('satellite-dropdown-component', 'value')]
+    )
+    def update_word_map(clicks, toggle, satellite_type):
+        sync_satellite(satellite_type)
+        return build_map(get_trigger_input(), clicks, toggle, satellite_type)
 
 
 if __name__ == '__main__':
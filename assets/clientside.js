@@ -0,0 +1,133 @@
+// Last sample appended to the histogram in push mode, the pending request for the whole histogram and when
+// the histogram was last sent whole
+var pushed = {view: null, count: 0, resync: null, since: 0};
+
+// Least time between two whole downsampled histograms in push mode, in milliseconds
+var DOWNSAMPLED_RESYNC_INTERVAL = 10000;
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    clientside: {
+        update_time: function(interval) {
+            var now = new Date();
+            var hour = String(now.getHours()).padStart(2, '0');
+            var minute = String(now.getMinutes()).padStart(2, '0');
+            return hour + ':' + minute;
+        },
+
+        update_non_gps_component: function(data) {
+            if (!data) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return ['elevation', 'temperature', 'speed', 'fuel', 'battery'].map(function(component) {
+                return data[component];
+            });
+        },
+
+        // The LED displays can't show a minus sign, negative values are told apart by their color
+        update_gps_component: function(data) {
+            if (!data) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return ['latitude', 'longitude'].map(function(component) {
+                return Math.abs(data[component]).toFixed(4).padStart(9, '0');
+            });
+        },
+
+        update_gps_color: function(data) {
+            if (!data) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return ['latitude', 'longitude'].map(function(component) {
+                return data[component] < 0 ? '#ff8e77' : '#ffe102';
+            });
+        },
+
+        // Sample-to-screen latency of the telemetry being rendered, on the browser clock but never less than
+        // the age the sample had when the server sent it. There is none before the satellite's first sample.
+        update_freshness: function(data) {
+            if (!data || data.ingested === undefined || data.ingested === null) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            var latency = Math.max(Date.now() / 1000 - data.ingested, data.served - data.ingested);
+            return {satellite: data.satellite, latency: latency};
+        },
+
+        update_freshness_component: function(freshness) {
+            if (!freshness) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return freshness.latency.toFixed(1);
+        },
+
+        // indicators is a list of [indicator id, names of the rules shown on it], in the order of the outputs
+        update_alert_indicators: function(data, indicators) {
+            if (!data || !data.alerts) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return indicators.map(function(indicator) {
+                var active = indicator[1].some(function(rule) {
+                    return data.alerts.indexOf(rule) !== -1;
+                });
+                return active ? '#ff8e77' : '#ffe102';
+            });
+        },
+
+        // Only changes when the alerts of the fleet changed, which has the alert list rebuilt
+        update_alerts_version: function(data, version) {
+            if (!data || data.alerts_version === undefined || data.alerts_version === version) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return data.alerts_version;
+        },
+
+        update_communication_component: function(clicks) {
+            return clicks % 2 !== 0;
+        },
+
+        // Push mode: stream the selected satellite's samples into store-data
+        open_telemetry_stream: function(satellite) {
+            if (window.telemetryStream) {
+                window.telemetryStream.close();
+            }
+            window.telemetryStream = new EventSource('telemetry/stream?satellite=' + encodeURIComponent(satellite));
+            window.telemetryStream.onmessage = function(event) {
+                window.dash_clientside.set_props('store-data', {data: JSON.parse(event.data)});
+            };
+            return satellite;
+        },
+
+        // Push mode: append pushed samples to the histogram and move the map marker
+        push_graphs: function(data, config) {
+            var no_update = window.dash_clientside.no_update;
+            var version = config && config.version;
+            if (!data || !version || version[0] !== data.satellite) {
+                return [no_update, no_update, no_update];
+            }
+
+            // version is [satellite, resolution, metric, samples in the last full figure], resync the request
+            // the last full figure answered
+            var view = version.join('/') + '/' + config.resync;
+            if (pushed.view !== view) {
+                pushed = {view: view, count: version[3], resync: null, since: Date.now()};
+            }
+            var sample = version[1] === 'minute' ? data : data.hour;
+            var count = version[1] === 'minute' ? data.count : data.hour_count;
+
+            var graph = no_update;
+            var resync = no_update;
+            if (count === pushed.count + 1 && !config.downsampled) {
+                graph = [{x: [[count - 1]], y: [[sample[version[2]]]]}, [0], config.points];
+                pushed.count = count;
+            } else if (count !== pushed.count && pushed.resync === null &&
+                       (!config.downsampled || Date.now() - pushed.since >= DOWNSAMPLED_RESYNC_INTERVAL)) {
+                // Missed events, or a server that restarted: have the server send the whole histogram rather
+                // than skew it. A downsampled point stands for many samples, appending raw samples would skew
+                // it too, so a downsampled histogram is sent whole again every so often instead.
+                pushed.resync = Date.now();
+                resync = pushed.resync;
+            }
+            var marker = [{lat: [[data.latitude]], lon: [[data.longitude]]}, [1], 1];
+            return [graph, marker, resync];
+        }
+    }
+});
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+#######################################################################################################################
+# Setup
+#######################################################################################################################
+
+# (satellites, history samples) runs by default, from the bundled fleet size to large fleets and long histories
+CONFIGS = [(2, 60), (2, 100000), (100, 3600), (1000, 60)]
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# How much worse than the baseline a run may get before it fails, relative, and by at least how many milliseconds
+# for times so that sub-millisecond calls don't fail on noise
+TIME_TOLERANCE = 0.5
+TIME_MARGIN_MS = 0.5
+SIZE_TOLERANCE = 0.1
+
+# Every measure of a callback: median wall time, peak memory allocated during a call and response size
+MEASURES = ['time_ms', 'alloc_kb', 'bytes']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the tick callbacks of the dashboard.')
+    parser.add_argument('--config', nargs='*', default=['{}x{}'.format(*config) for config in CONFIGS],
+                        help='runs as <satellites>x<history samples>')
+    parser.add_argument('--iterations', type=int, default=20, help='ticks measured per run')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--output', help='also write the results to this json file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+#######################################################################################################################
+# Worker
+#######################################################################################################################
+
+# Runs in its own process, the app reads its configuration (registry, history length) when imported. Callbacks are
+# called through the Dash dispatch of the Flask test client, with the inputs a browser would send on each tick. The
+# figure cache is emptied before every call, so each call pays for the first client looking at a new tick.
+def run_worker(iterations):
+    import app
+
+    client = app.server.test_client()
+    satellite = app.registry.ids()[0]
+
+    def post(output, inputs, state, changed):
+        body = {
+            'output': output,
+            'outputs': [{'id': o.split('.')[0], 'property': o.split('.')[1]} for o in output.strip('.').split('...')],
+            'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in inputs],
+            'state': [{'id': i, 'property': p, 'value': v} for i, p, v in state],
+            'changedPropIds': [changed],
+        }
+        if not output.startswith('..'):
+            body['outputs'] = body['outputs'][0]
+        response = client.post('/_dash-update-component', json=body)
+        if response.status_code not in (200, 204):
+            raise RuntimeError('{} failed: {}'.format(output, response.get_data(as_text=True)[-500:]))
+        return response
+
+    def graph_inputs(interval):
+        return [('interval', 'n_intervals', interval), ('satellite-dropdown-component', 'value', satellite),
+                ('control-panel-toggle-minute', 'value', True)] + \
+            [('control-panel-' + metric, 'n_clicks', None) for metric in app.graph_components]
+
+    def calls(interval, data_config):
+        return {
+            'update_data': lambda: post(
+                'store-data.data',
+                [('interval', 'n_intervals', interval), ('satellite-dropdown-component', 'value', satellite)],
+                [('store-freshness', 'data', {'satellite': satellite, 'latency': 1.0})], 'interval.n_intervals'),
+            'update_graph_tick': lambda: post(
+                '..graph-panel.figure...graph-panel.extendData...store-data-config.data..',
+                graph_inputs(interval), [('store-data-config', 'data', data_config)], 'interval.n_intervals'),
+            'update_graph_full': lambda: post(
+                '..graph-panel.figure...graph-panel.extendData...store-data-config.data..',
+                graph_inputs(interval), [('store-data-config', 'data', {'info_type': ''})],
+                'satellite-dropdown-component.value'),
+            'update_word_map_tick': lambda: post(
+                '..world-map.figure...world-map.extendData..',
+                [('interval', 'n_intervals', 2 * interval), ('control-panel-toggle-map', 'value', True),
+                 ('satellite-dropdown-component', 'value', satellite)], [], 'interval.n_intervals'),
+            'update_word_map_full': lambda: post(
+                '..world-map.figure...world-map.extendData..',
+                [('interval', 'n_intervals', 2 * interval), ('control-panel-toggle-map', 'value', True),
+                 ('satellite-dropdown-component', 'value', satellite)], [], 'satellite-dropdown-component.value'),
+        }
+
+    # The whole fleet is watched, so every tick replays a sample of each satellite
+    for watched in app.registry.ids():
+        app.telemetry_source.sync(watched)
+
+    def tick():
+        app.telemetry_source.start -= app.telemetry_source.period
+
+    def config_after(response):
+        return response.get_json()['response']['store-data-config']['data']
+
+    data_config = config_after(calls(0, {'info_type': ''})['update_graph_full']())
+    results = {name: {'time_ms': [], 'alloc_kb': [], 'bytes': []} for name in calls(0, data_config)}
+    for interval in range(1, iterations + 1):
+        # Timed pass on a new tick, then the allocations of the same calls on the next one
+        tick()
+        for name, call in calls(interval, data_config).items():
+            app.figure_cache.clear()
+            start = time.perf_counter()
+            response = call()
+            results[name]['time_ms'].append((time.perf_counter() - start) * 1000)
+            results[name]['bytes'].append(len(response.get_data()))
+            if name == 'update_graph_tick':
+                data_config = config_after(response)
+
+        tick()
+        for name, call in calls(interval, data_config).items():
+            app.figure_cache.clear()
+            tracemalloc.start()
+            response = call()
+            results[name]['alloc_kb'].append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+            if name == 'update_graph_tick':
+                data_config = config_after(response)
+
+    return {name: {measure: float(np.median(values)) for measure, values in measures.items()}
+            for name, measures in results.items()}
+
+
+#######################################################################################################################
+# Runs
+#######################################################################################################################
+
+def fleet(directory, satellites):
+    from data.generate_data import generate
+
+    output_dir = os.path.join(directory, 'fleet-{}'.format(satellites))
+    if not os.path.exists(os.path.join(output_dir, 'satellites.json')):
+        generate(argparse.Namespace(satellites=satellites, duration=600, rate=1, seed=0, orbit_period=5400,
+                                    min_inclination=20, max_inclination=100, chunk_size=1000000, prefix='sat',
+                                    output_dir=output_dir))
+    return os.path.join(output_dir, 'satellites.json')
+
+
+def run(directory, satellites, history, iterations):
+    env = dict(os.environ, SATELLITE_REGISTRY=fleet(directory, satellites), HISTORY_SAMPLES=str(history),
+               TELEMETRY_SOURCE='replay', CALLBACK_MODE='split', SHARED_TELEMETRY='', RESPONSE_COMPRESSION='')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', str(iterations)],
+                            cwd=ROOT, env=env, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+# Measures past the tolerance of their baseline, as readable lines
+def regressions(results, baseline):
+    failures = []
+    for config, callbacks in results.items():
+        for name, measures in callbacks.items():
+            expected = baseline.get(config, {}).get(name)
+            if expected is None:
+                continue
+            for measure in MEASURES:
+                tolerance = TIME_TOLERANCE if measure == 'time_ms' else SIZE_TOLERANCE
+                margin = TIME_MARGIN_MS if measure == 'time_ms' else 0
+                if measures[measure] > max(expected[measure] * (1 + tolerance), expected[measure] + margin):
+                    failures.append('{} {} {}: {:.2f} > {:.2f} (+{:.0%} allowed)'.format(
+                        config, name, measure, measures[measure], expected[measure], tolerance))
+    return failures
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(int(args.worker))))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for config in args.config:
+            satellites, history = (int(value) for value in config.split('x'))
+            print('{} satellites, {} samples of history'.format(satellites, history))
+            results[config] = run(directory, satellites, history, args.iterations)
+            for name, measures in results[config].items():
+                print('  {:<22} {:>9.2f} ms {:>10.1f} KiB allocated {:>9.0f} bytes'.format(
+                    name, measures['time_ms'], measures['alloc_kb'], measures['bytes']))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=4, sort_keys=True)
+        print('Baseline written to {}'.format(args.baseline))
+        return
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at {}, run with --update-baseline to store one'.format(args.baseline))
+        return
+    with open(args.baseline) as file:
+        failures = regressions(results, json.load(file))
+    for failure in failures:
+        print('REGRESSION ' + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#######################################################################################################################
+# Setup
+#######################################################################################################################
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the dashboard with simulated concurrent dashboards.')
+    parser.add_argument('--dashboards', type=int, default=20, help='concurrent dashboards')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4], help='gunicorn worker counts to test')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker')
+    parser.add_argument('--duration', type=float, default=30, help='seconds measured per worker count')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds run before measuring')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between two ticks of a dashboard')
+    parser.add_argument('--click-rate', type=float, default=0.05,
+                        help='chance per tick that a dashboard clicks a control panel component')
+    parser.add_argument('--switch-rate', type=float, default=0.01,
+                        help='chance per tick that a dashboard selects another satellite')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+#######################################################################################################################
+# Server
+#######################################################################################################################
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# `gunicorn app:server` started in the repository with the environment of this process, its CPU time and memory
+# are read from /proc for the master and its workers
+class Server:
+    def __init__(self, workers, threads):
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+             '--bind', '127.0.0.1:{}'.format(self.port), 'app:server'],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('The server exited with code {}'.format(self.process.returncode))
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                connection.request('GET', '/_dash-layout')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError('The server did not start within {}s'.format(timeout))
+
+    def pids(self):
+        pids = [self.process.pid]
+        for pid in os.listdir('/proc'):
+            try:
+                with open('/proc/{}/stat'.format(pid)) as file:
+                    if int(file.read().rsplit(')', 1)[1].split()[1]) == self.process.pid:
+                        pids.append(int(pid))
+            except (OSError, ValueError):
+                pass
+        return pids
+
+    # (CPU seconds used so far, resident memory in bytes) of the master and every worker
+    def usage(self):
+        tick = os.sysconf('SC_CLK_TCK')
+        cpu, rss = 0.0, 0
+        for pid in self.pids():
+            try:
+                with open('/proc/{}/stat'.format(pid)) as file:
+                    fields = file.read().rsplit(')', 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / tick
+                rss += int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+            except OSError:
+                pass
+        return cpu, rss
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+#######################################################################################################################
+# Dashboards
+#######################################################################################################################
+
+# Component props of a layout, 'id.property' -> value
+def layout_props(node, props):
+    if isinstance(node, dict):
+        if 'props' in node and 'type' in node:
+            if 'id' in node['props']:
+                for name, value in node['props'].items():
+                    props['{}.{}'.format(node['props']['id'], name)] = value
+            layout_props(node['props'].get('children'), props)
+        else:
+            for value in node.values():
+                layout_props(value, props)
+    elif isinstance(node, list):
+        for value in node:
+            layout_props(value, props)
+    return props
+
+
+# One browser showing the dashboard: sends the _dash-update-component requests Dash would send for the initial
+# load, every interval tick, control panel clicks and satellite changes, and keeps the props the responses set
+# so that later requests carry them (e.g. store-data-config). Callbacks of an event run one after the other.
+class Dashboard(threading.Thread):
+    def __init__(self, port, layout, dependencies, args, rng, results):
+        super().__init__(daemon=True)
+        self.port = port
+        self.props = layout_props(layout, {})
+        # Server callbacks only, clientside ones never reach the server
+        self.callbacks = [dependency for dependency in dependencies if not dependency.get('clientside_function')]
+        self.args = args
+        self.rng = rng
+        self.results = results
+        self.running = True
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def post(self, dependency, changed):
+        outputs = [output.split('.') for output in dependency['output'].strip('.').split('...')]
+        body = {
+            'output': dependency['output'],
+            'outputs': [{'id': i, 'property': p} for i, p in outputs],
+            'inputs': [dict(item, value=self.props.get('{}.{}'.format(item['id'], item['property'])))
+                       for item in dependency['inputs']],
+            'state': [dict(item, value=self.props.get('{}.{}'.format(item['id'], item['property'])))
+                      for item in dependency['state']],
+            'changedPropIds': changed,
+        }
+        if not dependency['output'].startswith('..'):
+            body['outputs'] = body['outputs'][0]
+
+        start = time.perf_counter()
+        try:
+            self.connection.request('POST', '/_dash-update-component', json.dumps(body),
+                                    {'Content-Type': 'application/json'})
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.results.append((time.time(), dependency['output'], None))
+            return []
+        self.results.append((time.time(), dependency['output'],
+                             (time.perf_counter() - start) if response.status in (200, 204) else None))
+        if response.status != 200:
+            return []
+
+        changed_props = []
+        for component, values in json.loads(data.decode('utf-8'))['response'].items():
+            for name, value in values.items():
+                self.props['{}.{}'.format(component, name)] = value
+                changed_props.append('{}.{}'.format(component, name))
+        return changed_props
+
+    # Run the callbacks triggered by the given props, then the ones their outputs trigger
+    def fire(self, changed):
+        while changed:
+            triggered = [dependency for dependency in self.callbacks
+                         if any('{}.{}'.format(item['id'], item['property']) in changed
+                                for item in dependency['inputs'])]
+            changed = [prop for dependency in triggered for prop in self.post(dependency, changed)]
+
+    def run(self):
+        # Initial load, every callback runs once
+        for dependency in self.callbacks:
+            self.post(dependency, [])
+
+        next_tick = time.time() + self.rng.uniform(0, self.args.interval)
+        while self.running:
+            time.sleep(max(0.0, next_tick - time.time()))
+            next_tick += self.args.interval
+
+            if self.rng.random() < self.args.switch_rate:
+                options = [option['value'] for option in self.props['satellite-dropdown-component.options']]
+                self.props['satellite-dropdown-component.value'] = self.rng.choice(options)
+                self.fire(['satellite-dropdown-component.value'])
+            if self.rng.random() < self.args.click_rate:
+                component = self.rng.choice([prop[:-len('.n_clicks')] for prop in self.props
+                                             if prop.startswith('control-panel-') and prop.endswith('.n_clicks')])
+                self.props[component + '.n_clicks'] = (self.props[component + '.n_clicks'] or 0) + 1
+                self.fire([component + '.n_clicks'])
+
+            self.props['interval.n_intervals'] = (self.props['interval.n_intervals'] or 0) + 1
+            self.fire(['interval.n_intervals'])
+
+
+#######################################################################################################################
+# Runs
+#######################################################################################################################
+
+def run(args, workers):
+    server = Server(workers, args.threads)
+    try:
+        server.wait_ready()
+        connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=30)
+        connection.request('GET', '/_dash-layout')
+        layout = json.loads(connection.getresponse().read().decode('utf-8'))
+        connection.request('GET', '/_dash-dependencies')
+        dependencies = json.loads(connection.getresponse().read().decode('utf-8'))
+
+        results = []
+        rng = random.Random(args.seed)
+        dashboards = [Dashboard(server.port, layout, dependencies, args, random.Random(rng.random()), results)
+                      for _ in range(args.dashboards)]
+        for dashboard in dashboards:
+            dashboard.start()
+
+        time.sleep(args.warmup)
+        start, (start_cpu, _) = time.time(), server.usage()
+        rss = []
+        while time.time() - start < args.duration:
+            time.sleep(1)
+            rss.append(server.usage()[1])
+        end, (end_cpu, _) = time.time(), server.usage()
+
+        for dashboard in dashboards:
+            dashboard.running = False
+    finally:
+        server.stop()
+
+    measured = [result for result in results if start <= result[0] <= end]
+    latencies = np.array([latency for _, _, latency in measured if latency is not None]) * 1000
+    return {
+        'workers': workers,
+        'requests': len(measured),
+        'errors': sum(latency is None for _, _, latency in measured),
+        'requests_per_second': len(measured) / (end - start),
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        'cpu_percent': (end_cpu - start_cpu) / (end - start) * 100,
+        'rss_mb': max(rss) / 1024 / 1024 if rss else float('nan'),
+    }
+
+
+def main():
+    args = parse_args()
+    print('{} dashboards, one tick every {}s, {}s measured after {}s of warmup'.format(
+        args.dashboards, args.interval, args.duration, args.warmup))
+    print('{:>7} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9} {:>7} {:>8}'.format(
+        'workers', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'CPU %', 'RSS MB'))
+    for workers in args.workers:
+        result = run(args, workers)
+        print('{workers:>7} {requests:>9} {errors:>7} {requests_per_second:>9.1f} {p50_ms:>9.1f} {p95_ms:>9.1f} '
+              '{p99_ms:>9.1f} {cpu_percent:>7.0f} {rss_mb:>8.0f}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import bisect
+import threading
+import time
+
+import flask
+
+##############################################################################################################
+# Callback metrics
+##############################################################################################################
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+# Counts of one callback since the process started
+class CallbackStats:
+    def __init__(self, buckets):
+        self.calls = 0
+        self.exceptions = 0
+        # Calls per latency bucket, the last one for calls slower than every bound
+        self.latency_counts = [0] * (len(buckets) + 1)
+        self.latency_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+# Label value escaped for the Prometheus text format
+def label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Records the calls, latency, request and response sizes (before compression) and exceptions of every server
+# callback of a Dash app, and serves them in the Prometheus text format on a route of its Flask server. Calls
+# are timed around the whole Dash dispatch, JSON decoding and encoding included. Counts are kept per process,
+# each gunicorn worker serves its own.
+class CallbackMetrics:
+    def __init__(self, app, path='/metrics', buckets=LATENCY_BUCKETS):
+        self.callback_map = app.callback_map
+        self.dispatch_path = app.config.routes_pathname_prefix + '_dash-update-component'
+        self.buckets = list(buckets)
+        # callback name -> CallbackStats
+        self.stats = {}
+        # callback output id -> callback name
+        self.names = {}
+        # Functions returning the lines of other metrics to serve, see add_metric and add_collector
+        self.collectors = []
+        self.lock = threading.Lock()
+        app.server.before_request(self.start)
+        app.server.after_request(self.record)
+        app.server.add_url_rule(path, 'callback_metrics', self.render)
+
+    # Serves the value returned by value() when the metrics are read, e.g. counters kept by other objects
+    def add_metric(self, name, metric_type, help_text, value):
+        self.add_collector(lambda: ['# HELP {} {}'.format(name, help_text), '# TYPE {} {}'.format(name, metric_type),
+                                    '{} {}'.format(name, value())])
+
+    # Serves the lines in the Prometheus text format returned by collect() when the metrics are read
+    def add_collector(self, collect):
+        self.collectors.append(collect)
+
+    # Requests for unknown outputs share one name and aren't remembered, so that they can't add labels or
+    # names without bound
+    def _name(self, output):
+        if not isinstance(output, str):
+            return 'unknown'
+        name = self.names.get(output)
+        if name is None:
+            callback = self.callback_map.get(output, {}).get('callback')
+            if callback is None:
+                return 'unknown'
+            name = self.names[output] = callback.__name__
+        return name
+
+    def start(self):
+        environ = flask.request._get_current_object().environ
+        if environ.get('PATH_INFO') == self.dispatch_path:
+            environ['callback_metrics.start'] = time.perf_counter()
+
+    # Looks the request up once and reads its WSGI environ and raw headers, attribute access through the Flask
+    # proxy and the parsed Content-Length properties cost microseconds each
+    def record(self, response):
+        request = flask.request._get_current_object()
+        start = request.environ.get('callback_metrics.start')
+        if start is None:
+            return response
+        latency = time.perf_counter() - start
+
+        # Already decoded by the Dash dispatch
+        body = request.get_json(silent=True)
+        name = self._name(body.get('output') if isinstance(body, dict) else None)
+        request_bytes = int(request.environ.get('CONTENT_LENGTH') or 0)
+        response_bytes = int(response.headers.get('Content-Length') or 0)
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallbackStats(self.buckets)
+            stats.calls += 1
+            if response.status_code >= 500:
+                stats.exceptions += 1
+            stats.latency_counts[bisect.bisect_left(self.buckets, latency)] += 1
+            stats.latency_sum += latency
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+        return response
+
+    def _lines(self):
+        with self.lock:
+            stats = {name: (s.calls, s.exceptions, list(s.latency_counts), s.latency_sum, s.request_bytes,
+                            s.response_bytes) for name, s in sorted(self.stats.items())}
+
+        lines = []
+        for metric, metric_type, help_text, index in [
+                ('dash_callback_calls_total', 'counter', 'Calls of the callback.', 0),
+                ('dash_callback_exceptions_total', 'counter', 'Calls of the callback that raised.', 1),
+                ('dash_callback_request_bytes_total', 'counter', 'Bytes of the callback requests.', 4),
+                ('dash_callback_response_bytes_total', 'counter',
+                 'Bytes of the callback responses, before compression.', 5)]:
+            lines += ['# HELP {} {}'.format(metric, help_text), '# TYPE {} {}'.format(metric, metric_type)]
+            lines += ['{}{{callback="{}"}} {}'.format(metric, label(name), values[index])
+                      for name, values in stats.items()]
+
+        metric = 'dash_callback_latency_seconds'
+        lines += ['# HELP {} Time to dispatch the callback.'.format(metric), '# TYPE {} histogram'.format(metric)]
+        for name, values in stats.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], values[2]):
+                cumulative += count
+                lines.append('{}_bucket{{callback="{}",le="{}"}} {}'.format(metric, label(name), bound, cumulative))
+            lines.append('{}_sum{{callback="{}"}} {}'.format(metric, label(name), values[3]))
+            lines.append('{}_count{{callback="{}"}} {}'.format(metric, label(name), values[0]))
+
+        for collect in self.collectors:
+            lines += collect()
+        return lines
+
+    def render(self):
+        return flask.Response('\n'.join(self._lines()) + '\n', mimetype='text/plain; version=0.0.4')
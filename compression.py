@@ -0,0 +1,54 @@
+import gzip
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+##############################################################################################################
+# Response compression
+##############################################################################################################
+
+
+# Compresses the responses of the given paths of a Flask server when they are at least min_size bytes long,
+# with the first of encodings ('br', 'gzip') the client accepts. Brotli is only used when the brotli package
+# is installed. Streamed responses (e.g. Server-Sent Events) are left alone.
+class ResponseCompression:
+    def __init__(self, server, paths, encodings=('br', 'gzip'), min_size=1024, gzip_level=6, brotli_level=5):
+        self.paths = set(paths)
+        self.encodings = [encoding for encoding in encodings
+                          if encoding == 'gzip' or (encoding == 'br' and brotli is not None)]
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+        server.after_request(self.compress)
+
+    def _encoding(self, accept_encodings):
+        for encoding in self.encodings:
+            if accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def _compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_level)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def compress(self, response):
+        if flask.request.path not in self.paths or not self.encodings:
+            return response
+        # Whether the response is compressed depends on the request headers
+        response.vary.add('Accept-Encoding')
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed or \
+                'Content-Encoding' in response.headers:
+            return response
+
+        encoding = self._encoding(flask.request.accept_encodings)
+        if encoding is None or response.content_length is None or response.content_length < self.min_size:
+            return response
+
+        response.set_data(self._compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import telemetry_format  # noqa: E402
+
+#######################################################################################################################
+# Setup
+#######################################################################################################################
+
+# Range of each satellite's base value, and how far samples stray from it (relative), like populate_data.py
+# does for the per-second recordings of the bundled satellites. The dashboard rolls the samples up into its
+# hour view, so only these are generated.
+NON_GPS = {
+    'elevation': {'base': (550, 800), 'variance': 0.025},
+    'temperature': {'base': (250, 350), 'variance': 0.025},
+    'speed': {'base': (250, 330), 'variance': 0.05},
+    'fuel': {'base': (60, 90), 'variance': 0.02},
+    'battery': {'base': (60, 90), 'variance': 0.02},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate synthetic satellite telemetry as .tlm files.')
+    parser.add_argument('--satellites', type=int, default=2, help='number of satellites')
+    parser.add_argument('--duration', type=float, default=3600, help='recorded time span, in seconds')
+    parser.add_argument('--rate', type=float, default=1, help='samples per second of the minute recording')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--orbit-period', type=float, default=5400, help='seconds per orbit')
+    parser.add_argument('--min-inclination', type=float, default=20, help='lowest orbit inclination, in degrees')
+    parser.add_argument('--max-inclination', type=float, default=100, help='highest orbit inclination, in degrees')
+    parser.add_argument('--chunk-size', type=int, default=1000000, help='rows generated at once')
+    parser.add_argument('--prefix', default='sat', help='prefix of the generated satellite ids')
+    parser.add_argument('--output-dir', default='./generated')
+    return parser.parse_args()
+
+
+#######################################################################################################################
+# Data Generation
+#######################################################################################################################
+
+# Same distribution as populate_data.randomize, for a whole array of samples
+def randomize(rng, start, variance, size):
+    max_diff = np.floor(start * variance)
+    sign = 1 - 2 * rng.integers(0, 2, size)
+    return start + sign * np.floor(rng.random(size) * (max_diff + 1))
+
+
+# Fill the columns of one recording, positions are not recorded but propagated from the orbit
+def fill(columns, rng, base, n_rows, chunk_size):
+    for start in range(0, n_rows, chunk_size):
+        end = min(n_rows, start + chunk_size)
+        size = end - start
+        for metric, spec in NON_GPS.items():
+            values = randomize(rng, base[metric], spec['variance'], size)
+            columns[metric][start:end] = values / 10 if metric == 'speed' else values
+
+    for values in columns.values():
+        values.flush()
+
+
+def generate(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    n_rows = max(1, int(args.duration * args.rate))
+
+    registry = {'satellites': []}
+    seeds = np.random.SeedSequence(args.seed).spawn(args.satellites)
+    for i, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+
+        base = {metric: int(rng.integers(*spec['base'], endpoint=True)) for metric, spec in NON_GPS.items()}
+        # Elements as described in orbit.py
+        orbit = {
+            'period': args.orbit_period,
+            'inclination': rng.uniform(args.min_inclination, args.max_inclination),
+            'node_longitude': rng.uniform(-180, 180),
+            'argument': rng.uniform(0, 360),
+        }
+
+        satellite_id = '{}-{:04d}'.format(args.prefix, i)
+        file_name = '{}_m.tlm'.format(satellite_id)
+        columns = telemetry_format.create(os.path.join(args.output_dir, file_name),
+                                          {metric: n_rows for metric in NON_GPS})
+        fill(columns, rng, base, n_rows, args.chunk_size)
+
+        registry['satellites'].append({
+            'id': satellite_id,
+            'label': satellite_id.upper(),
+            'description': 'Synthetic satellite {} generated with seed {}.'.format(satellite_id.upper(), args.seed),
+            'data': {'minute': file_name},
+            'orbit': orbit,
+        })
+
+    # Registry of the generated satellites, usable through SATELLITE_REGISTRY
+    with open(os.path.join(args.output_dir, 'satellites.json'), 'w') as file:
+        json.dump(registry, file, indent=4)
+    return n_rows
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    start = time.time()
+    n_rows = generate(args)
+    print('Generated {} satellites x {} rows in {} in {:.2f}s'.format(
+        args.satellites, n_rows, args.output_dir, time.time() - start))
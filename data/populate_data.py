@@ -3,26 +3,16 @@ from random import randint
 #######################################################################################################################
 # Setup
 #######################################################################################################################
-# Default data
-file_h = open('non_gps_data_h.csv', 'w')
-file_m = open('non_gps_data_m.csv', 'w')
+# Only the per-second recordings, the dashboard rolls them up into its hour view
 
 # Satellite H45-K1 data
-file_h_0 = open('non_gps_data_h_0.csv', 'w')
 file_m_0 = open('non_gps_data_m_0.csv', 'w')
 
 # Satellite L12-5 data
-file_h_1 = open('non_gps_data_h_1.csv', 'w')
 file_m_1 = open('non_gps_data_m_1.csv', 'w')
 
 # Initialize the first column
-file_h.write('elevation,temperature,speed,fuel,battery\n')
-file_m.write('elevation,temperature,speed,fuel,battery\n')
-
-file_h_0.write('elevation,temperature,speed,fuel,battery\n')
 file_m_0.write('elevation,temperature,speed,fuel,battery\n')
-
-file_h_1.write('elevation,temperature,speed,fuel,battery\n')
 file_m_1.write('elevation,temperature,speed,fuel,battery\n')
 
 
@@ -43,26 +33,6 @@ def add_data(data, file):
 # Data Generation
 #######################################################################################################################
 
-# Data updated by the minute (default data)
-for i in range(60):
-    for j in range(4):
-        file_h.write(str(0) + ',')
-    file_h.write(str(0) + '\n')
-
-# Data updated by the second (default data)
-for i in range(60):
-    for j in range(4):
-        file_m.write(str(0) + ',')
-    file_m.write(str(0) + '\n')
-
-# Data updated by the minute (H45-K1 data)
-for i in range(60):
-    add_data(randomize(650, 0.2), file_h_0)
-    add_data(randomize(290, 0.2), file_h_0)
-    add_data((randomize(280, 0.2) / 10), file_h_0)
-    add_data(randomize(80, 0.05), file_h_0)
-    file_h_0.write(str(randomize(80, 0.05)) + '\n')
-
 # Data updated by the second (H45-K1 data)
 for i in range(60):
     add_data(randomize(650, 0.025), file_m_0)
@@ -71,14 +41,6 @@ for i in range(60):
     add_data(randomize(80, 0.02), file_m_0)
     file_m_0.write(str(randomize(80, 0.02)) + '\n')
 
-# Data updated by the minute (L12-5 data)
-for i in range(60):
-    add_data(randomize(750, 0.2), file_h_1)
-    add_data(randomize(350, 0.2), file_h_1)
-    add_data((randomize(280, 0.2) / 10), file_h_1)
-    add_data(randomize(80, 0.05), file_h_1)
-    file_h_1.write(str(randomize(80, 0.05)) + '\n')
-
 # Data updated by the second (L12-5 data)
 for i in range(60):
     add_data(randomize(650, 0.025), file_m_1)
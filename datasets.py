@@ -0,0 +1,43 @@
+import collections
+import threading
+
+import telemetry_format
+
+##############################################################################################################
+# Dataset cache
+##############################################################################################################
+
+
+# Loads a satellite's recordings on first use and keeps the most recently used ones, evicting the least
+# recently used satellites once the cached data grows past max_bytes
+class DatasetCache:
+    def __init__(self, paths, max_bytes=256 * 1024 * 1024):
+        # satellite -> {resolution: path of its .tlm file}
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.datasets = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, satellite):
+        return satellite in self.paths
+
+    def get(self, satellite):
+        with self.lock:
+            if satellite in self.datasets:
+                self.datasets.move_to_end(satellite)
+                return self.datasets[satellite][0]
+
+        dataset = {resolution: telemetry_format.load(path) for resolution, path in self.paths[satellite].items()}
+        size = sum(values.nbytes for columns in dataset.values() for values in columns.values())
+
+        with self.lock:
+            if satellite not in self.datasets:
+                self.datasets[satellite] = (dataset, size)
+                self.size += size
+            self.datasets.move_to_end(satellite)
+            # Always keep the satellite that was just asked for
+            while self.size > self.max_bytes and len(self.datasets) > 1:
+                _, (_, evicted_size) = self.datasets.popitem(last=False)
+                self.size -= evicted_size
+            return self.datasets[satellite][0]
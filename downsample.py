@@ -0,0 +1,73 @@
+import numpy as np
+
+##############################################################################################################
+# Downsampling
+##############################################################################################################
+
+
+# Indices of at most n points keeping the visual shape of the (x, y) line, Largest-Triangle-Three-Buckets.
+# Points are bucketed by position, so x and y can be any curve (e.g. longitude/latitude of a track).
+def lttb_indices(x, y, n):
+    length = len(y)
+    if n >= length:
+        return np.arange(length)
+    if n < 3:
+        return np.array([0, length - 1][:max(n, 0)])
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # First and last points are always kept, the rest is split into n - 2 buckets
+    edges = np.linspace(1, length - 1, n - 1).astype(int)
+    # Average point of every bucket, the third vertex of the triangles of the previous bucket
+    sums_x = np.add.reduceat(x[1:length - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:length - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    averages_x = np.append(sums_x / sizes, x[-1])
+    averages_y = np.append(sums_y / sizes, y[-1])
+
+    indices = np.empty(n, dtype=int)
+    indices[0] = 0
+    indices[-1] = length - 1
+    a = 0
+    for bucket in range(n - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the area of the triangles (a, point, average of the next bucket), for the whole bucket at once
+        areas = np.abs((x[a] - averages_x[bucket + 1]) * (y[start:end] - y[a]) -
+                       (x[a] - x[start:end]) * (averages_y[bucket + 1] - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[bucket + 1] = a
+    return indices
+
+
+# Indices of the minimum and maximum of y in n // 2 equal buckets, in their original order, keeps every peak
+def minmax_indices(y, n):
+    length = len(y)
+    buckets = n // 2
+    if n >= length or buckets < 1:
+        return np.arange(length)
+
+    y = np.asarray(y, dtype=float)
+    size = -(-length // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:length] = y
+    padded = padded.reshape(buckets, size)
+    # Buckets at the end may only hold padding
+    valid = ~np.all(np.isnan(padded), axis=1)
+    padded = padded[valid]
+    offsets = np.arange(buckets)[valid] * size
+
+    lows = offsets + np.nanargmin(padded, axis=1)
+    highs = offsets + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate((lows, highs)))
+
+
+# Downsample an (x, y) line to at most n points, mode is 'lttb' or 'minmax'
+def downsample(x, y, n, mode='lttb'):
+    if mode == 'lttb':
+        indices = lttb_indices(x, y, n)
+    elif mode == 'minmax':
+        indices = minmax_indices(y, n)
+    else:
+        raise ValueError('Unknown downsampling mode {}'.format(mode))
+    return np.asarray(x)[indices], np.asarray(y)[indices]
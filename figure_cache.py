@@ -0,0 +1,58 @@
+import collections
+import threading
+
+##############################################################################################################
+# Figure cache
+##############################################################################################################
+
+
+# Figures shared by every client looking at the same view, e.g. (satellite, metric, resolution). Only the
+# figure of the newest data version of a view is kept, a request for a newer version replaces it. At most
+# max_entries views are kept, the least recently used ones are evicted first. When many clients ask for
+# the same missing figure at once, one builds it and the others wait for it.
+class FigureCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        # view -> (version, figure)
+        self.entries = collections.OrderedDict()
+        # view -> lock held while its figure is built
+        self.building = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, view, version):
+        entry = self.entries.get(view)
+        if entry is not None and entry[0] == version:
+            self.entries.move_to_end(view)
+            self.hits += 1
+            return entry
+        return None
+
+    # Figure of a view at a data version, build() makes it when it isn't cached yet. Figures are shared,
+    # callers must not change them.
+    def get(self, view, version, build):
+        with self.lock:
+            entry = self._lookup(view, version)
+            if entry is not None:
+                return entry[1]
+            build_lock = self.building.setdefault(view, threading.Lock())
+
+        with build_lock:
+            with self.lock:
+                entry = self._lookup(view, version)
+                if entry is not None:
+                    return entry[1]
+                self.misses += 1
+            figure = build()
+            with self.lock:
+                self.entries[view] = (version, figure)
+                self.entries.move_to_end(view)
+                while len(self.entries) > self.max_entries:
+                    evicted, _ = self.entries.popitem(last=False)
+                    self.building.pop(evicted, None)
+            return figure
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
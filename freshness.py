@@ -0,0 +1,67 @@
+import bisect
+import math
+import threading
+
+from callback_metrics import label
+
+##############################################################################################################
+# Telemetry freshness
+##############################################################################################################
+
+# Upper bounds of the sample-to-screen latency histogram buckets, in seconds
+FRESHNESS_BUCKETS = [0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0, 300.0]
+
+# Latencies past a day don't come from stale telemetry but from a browser clock that is way off, or a report
+# without a sample time
+MAX_LATENCY = 24 * 3600
+
+
+# Sample-to-screen latency per satellite: the time from a sample reaching the telemetry store to the browser
+# rendering it, as reported by the browsers. Kept per process like the callback metrics.
+class FreshnessTracker:
+    def __init__(self, buckets=FRESHNESS_BUCKETS, max_latency=MAX_LATENCY):
+        self.buckets = list(buckets)
+        self.max_latency = max_latency
+        # satellite -> [reports per bucket (the last one past every bound), sum, count, latest]
+        self.latency = {}
+        self.lock = threading.Lock()
+
+    # Record a latency reported by a browser, in seconds. Browser and server clocks differ a little, a
+    # negative latency counts as none. Latencies past max_latency are dropped.
+    def record(self, satellite, latency):
+        if not isinstance(latency, (int, float)) or not math.isfinite(latency) or latency > self.max_latency:
+            return
+        latency = max(0.0, float(latency))
+        with self.lock:
+            stats = self.latency.get(satellite)
+            if stats is None:
+                stats = self.latency[satellite] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            stats[0][bisect.bisect_left(self.buckets, latency)] += 1
+            stats[1] += latency
+            stats[2] += 1
+            stats[3] = latency
+
+    # Metric lines in the Prometheus text format, see callback_metrics.CallbackMetrics.add_collector
+    def lines(self):
+        with self.lock:
+            latency = {satellite: (list(stats[0]), stats[1], stats[2], stats[3])
+                       for satellite, stats in sorted(self.latency.items())}
+
+        metric = 'telemetry_sample_to_screen_seconds'
+        lines = ['# HELP {} Time from a sample reaching the server to a browser rendering it.'.format(metric),
+                 '# TYPE {} histogram'.format(metric)]
+        for satellite, (counts, total, count, _) in latency.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{{satellite="{}",le="{}"}} {}'.format(metric, label(satellite), bound,
+                                                                           cumulative))
+            lines.append('{}_sum{{satellite="{}"}} {}'.format(metric, label(satellite), total))
+            lines.append('{}_count{{satellite="{}"}} {}'.format(metric, label(satellite), count))
+
+        metric = 'telemetry_sample_to_screen_latest_seconds'
+        lines += ['# HELP {} Sample-to-screen latency last reported.'.format(metric),
+                  '# TYPE {} gauge'.format(metric)]
+        lines += ['{}{{satellite="{}"}} {}'.format(metric, label(satellite), latest)
+                  for satellite, (_, _, _, latest) in latency.items()]
+        return lines
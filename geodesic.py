@@ -0,0 +1,74 @@
+import numpy as np
+
+##############################################################################################################
+# Great-circle paths
+##############################################################################################################
+
+
+# Unit vectors of points on the sphere, latitudes and longitudes in degrees
+def _vectors(lat, lon):
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+# Insert points along the great circle between consecutive points of a track so that no step is longer than
+# max_step degrees, for every segment at once. NaN points (breaks in the track) are kept and not bridged.
+# Returns (latitudes, longitudes), longitudes in [-180, 180).
+def densify(lat, lon, max_step=1.0):
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) < 2:
+        return lat, np.mod(lon + 180, 360) - 180
+
+    broken = ~(np.isfinite(lat) & np.isfinite(lon))
+    vectors = _vectors(np.where(broken, 0, lat), np.where(broken, 0, lon))
+    start, end = vectors[:-1], vectors[1:]
+    angle = np.arccos(np.clip(np.sum(start * end, axis=1), -1, 1))
+
+    # Points each segment contributes, its end excluded, a segment touching a break only keeps its start
+    steps = np.maximum(1, np.ceil(np.degrees(angle) / max_step)).astype(int)
+    steps[broken[:-1] | broken[1:]] = 1
+    offsets = np.cumsum(steps) - steps
+    segment = np.repeat(np.arange(len(steps)), steps)
+    fraction = (np.arange(len(segment)) - offsets[segment]) / steps[segment]
+
+    # Spherical linear interpolation, plain linear between (nearly) identical points
+    angle = angle[segment]
+    sine = np.sin(angle)
+    curved = sine > 1e-9
+    safe_sine = np.where(curved, sine, 1)
+    start_weight = np.where(curved, np.sin((1 - fraction) * angle) / safe_sine, 1 - fraction)
+    end_weight = np.where(curved, np.sin(fraction * angle) / safe_sine, fraction)
+    points = start_weight[:, None] * start[segment] + end_weight[:, None] * end[segment]
+    points = np.vstack((points, vectors[-1:]))
+
+    new_lat = np.degrees(np.arctan2(points[:, 2], np.hypot(points[:, 0], points[:, 1])))
+    new_lon = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    new_lon = np.mod(new_lon + 180, 360) - 180
+    # Breaks stay breaks
+    gaps = np.append(offsets, len(points) - 1)[broken]
+    new_lat[gaps] = np.nan
+    new_lon[gaps] = np.nan
+    return new_lat, new_lon
+
+
+# Cut a track where it crosses the antimeridian: each side is drawn up to the ±180° edge and a NaN point
+# separates them, so plots don't draw a line across the whole map. Returns (latitudes, longitudes).
+def split_antimeridian(lat, lon):
+    lat = np.asarray(lat, dtype=float)
+    lon = np.mod(np.asarray(lon, dtype=float) + 180, 360) - 180
+    before = np.flatnonzero(np.abs(np.diff(lon)) > 180)
+    if not len(before):
+        return lat, lon
+    after = before + 1
+
+    # Edge the track leaves through, the longitude after the crossing continued past it
+    edge = np.where(lon[before] > 0, 180.0, -180.0)
+    fraction = (edge - lon[before]) / (lon[after] + 2 * edge - lon[before])
+    crossing = lat[before] + fraction * (lat[after] - lat[before])
+
+    positions = np.repeat(after, 3)
+    lat = np.insert(lat, positions, np.column_stack((crossing, np.full(len(after), np.nan), crossing)).ravel())
+    lon = np.insert(lon, positions, np.column_stack((edge, np.full(len(after), np.nan), -edge)).ravel())
+    return lat, lon
@@ -0,0 +1,172 @@
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from telemetry import METRICS
+
+logger = logging.getLogger(__name__)
+
+##############################################################################################################
+# Frames
+##############################################################################################################
+
+# One telemetry sample on the wire: index of the satellite in the registry, time it was sampled (seconds
+# since the epoch) and its metrics. A datagram holds any number of frames back to back.
+FRAME_DTYPE = np.dtype([('satellite', '<u4'), ('timestamp', '<f8')] + [(metric, '<f8') for metric in METRICS])
+
+# Frames per datagram, keeps datagrams well under the usual 64KiB limit
+FRAMES_PER_DATAGRAM = 512
+
+
+def encode(satellites, timestamps, rows):
+    frames = np.empty(len(rows), dtype=FRAME_DTYPE)
+    frames['satellite'] = satellites
+    frames['timestamp'] = timestamps
+    for i, metric in enumerate(METRICS):
+        frames[metric] = rows[:, i]
+    return frames.tobytes()
+
+
+# Split decoded frames per satellite index, yields (satellite index, timestamps, rows)
+def group_frames(frames):
+    frames = frames[np.argsort(frames['satellite'], kind='stable')]
+    indexes, starts = np.unique(frames['satellite'], return_index=True)
+    for index, chunk in zip(indexes, np.split(frames, starts[1:])):
+        rows = np.column_stack([chunk[metric] for metric in METRICS])
+        yield int(index), chunk['timestamp'], rows
+
+
+##############################################################################################################
+# Ingest
+##############################################################################################################
+
+# Receives telemetry frames on a UDP socket in a background thread and appends them to a TelemetryStore,
+# independently of browser polls. Datagrams are read in batches of up to batch_size and decoded at once.
+class IngestServer:
+    def __init__(self, store, registry, host='127.0.0.1', port=5005, batch_size=256):
+        self.store = store
+        self.satellites = registry.ids()
+        self.address = (host, port)
+        self.batch_size = batch_size
+        self.frames = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+            try:
+                sock.bind(self.address)
+            except OSError as e:
+                # Another process (e.g. another gunicorn worker) already owns the feed
+                logger.warning('Telemetry ingest disabled, cannot bind %s:%s: %s', *self.address, e)
+                sock.close()
+                self.thread = False
+                return
+            sock.settimeout(0.5)
+            self.thread = threading.Thread(target=self._run, args=(sock,), name='telemetry-ingest', daemon=True)
+            self.thread.start()
+
+    # The store is fed by the ingest thread, callbacks only make sure it runs and the satellite has buffers.
+    # Only satellites of the registry get buffers.
+    def sync(self, satellite=None):
+        if self.thread is None:
+            self.start()
+        if satellite is not None and satellite not in self.store:
+            if satellite not in self.satellites:
+                raise KeyError('Unknown satellite {}'.format(satellite))
+            with self.store.lock:
+                if satellite not in self.store:
+                    self.store.add_satellite(satellite)
+        return self.frames
+
+    def _run(self, sock):
+        while True:
+            datagrams = []
+            try:
+                datagrams.append(sock.recv(65536))
+                sock.setblocking(False)
+                while len(datagrams) < self.batch_size:
+                    datagrams.append(sock.recv(65536))
+            except (socket.timeout, BlockingIOError):
+                pass
+            finally:
+                sock.settimeout(0.5)
+            if datagrams:
+                try:
+                    self.ingest(b''.join(datagrams))
+                except Exception:
+                    logger.exception('Dropped a telemetry batch')
+
+    def ingest(self, data):
+        # Ignore a truncated trailing frame
+        data = data[:len(data) - len(data) % FRAME_DTYPE.itemsize]
+        frames = np.frombuffer(data, dtype=FRAME_DTYPE)
+        for index, timestamps, rows in group_frames(frames):
+            if index < len(self.satellites):
+                self.store.ingest(self.satellites[index], timestamps, rows)
+        self.store.end_batch()
+        self.frames += len(frames)
+
+
+##############################################################################################################
+# Simulator
+##############################################################################################################
+
+# Play the recordings of the registry into the ingest socket, rate is in samples per second per satellite.
+# Positions of the satellites with an orbit in orbits are propagated, the others are replayed.
+def simulate(registry, datasets, orbits, host='127.0.0.1', port=5005, rate=0.5, duration=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    recordings = [datasets.get(satellite)['minute'] for satellite in registry.ids()]
+    indexes = np.arange(len(recordings), dtype='<u4')
+    orbiting = [i for i, satellite in enumerate(registry.ids()) if satellite in orbits]
+    orbiting_ids = [registry.ids()[i] for i in orbiting]
+
+    sample = 0
+    start = time.time()
+    while duration is None or time.time() - start < duration:
+        now = time.time()
+        rows = np.zeros((len(recordings), len(METRICS)))
+        for i, recording in enumerate(recordings):
+            for j, metric in enumerate(METRICS):
+                if metric in recording:
+                    values = recording[metric]
+                    rows[i, j] = values[sample % len(values)]
+        if orbiting:
+            latitude, longitude = orbits.positions(orbiting_ids, [now])
+            rows[orbiting, METRICS.index('latitude')] = latitude[:, 0]
+            rows[orbiting, METRICS.index('longitude')] = longitude[:, 0]
+        data = encode(indexes, np.full(len(recordings), now), rows)
+
+        step = FRAMES_PER_DATAGRAM * FRAME_DTYPE.itemsize
+        for offset in range(0, len(data), step):
+            sock.sendto(data[offset:offset + step], (host, port))
+
+        sample += 1
+        time.sleep(max(0.0, start + sample / rate - time.time()))
+
+
+if __name__ == '__main__':
+    from datasets import DatasetCache
+    from orbit import OrbitTracks
+    from satellites import SatelliteRegistry
+
+    parser = argparse.ArgumentParser(description='Play recorded telemetry into the dashboard ingest socket.')
+    parser.add_argument('--registry', default=os.environ.get('SATELLITE_REGISTRY', './data/satellites.json'))
+    parser.add_argument('--host', default=os.environ.get('INGEST_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('INGEST_PORT', 5005)))
+    parser.add_argument('--rate', type=float, default=0.5, help='samples per second per satellite')
+    parser.add_argument('--duration', type=float, default=None, help='seconds to run, forever by default')
+    args = parser.parse_args()
+
+    satellite_registry = SatelliteRegistry.load(args.registry)
+    simulate(satellite_registry, DatasetCache(satellite_registry.data_paths()),
+             OrbitTracks(satellite_registry.orbits()), args.host, args.port, args.rate, args.duration)
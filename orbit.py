@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+
+##############################################################################################################
+# Orbit propagation
+##############################################################################################################
+
+# Sidereal rotation rate of the earth, in degrees per second
+EARTH_ROTATION = 360 / 86164.0905
+
+
+# One element of every orbit as a column, to broadcast against the time axis
+def _element(orbits, name, default=0.0):
+    return np.array([orbit.get(name, default) for orbit in orbits], dtype=float)[:, None]
+
+
+# Sub-satellite points of circular orbits, for every orbit at once. timestamps (seconds since the epoch) is
+# either one array for all orbits or one row per orbit. Returns (latitude, longitude) arrays of shape
+# (len(orbits), samples) in degrees, longitudes in [-180, 180).
+def propagate(orbits, timestamps):
+    t = np.atleast_2d(np.asarray(timestamps, dtype=float)) - _element(orbits, 'epoch')
+    inclination = np.radians(_element(orbits, 'inclination'))
+    # Argument of latitude, the angle travelled from the ascending node
+    u = np.radians(_element(orbits, 'argument') + 360 * t / _element(orbits, 'period'))
+
+    latitude = np.degrees(np.arcsin(np.sin(inclination) * np.sin(u)))
+    # Angle from the ascending node along the equator, minus the rotation of the earth underneath
+    longitude = _element(orbits, 'node_longitude') + \
+        np.degrees(np.arctan2(np.cos(inclination) * np.sin(u), np.cos(u))) - EARTH_ROTATION * t
+    return latitude, np.mod(longitude + 180, 360) - 180
+
+
+# Orbits of the registry satellites, satellite -> elements:
+#   period           seconds per revolution
+#   inclination      degrees
+#   node_longitude   longitude of the ascending node at the epoch, degrees
+#   argument         argument of latitude at the epoch, degrees
+#   epoch            seconds since the unix epoch, 0 by default
+# The ground track of a satellite is computed once per revolution, with `samples` points.
+class OrbitTracks:
+    def __init__(self, orbits, samples=3600):
+        self.orbits = orbits
+        self.samples = samples
+        # satellite -> (start of the revolution, latitudes, longitudes)
+        self.tracks = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, satellite):
+        return satellite in self.orbits
+
+    # Positions of several satellites at the given timestamps, see propagate
+    def positions(self, satellites, timestamps):
+        return propagate([self.orbits[satellite] for satellite in satellites], timestamps)
+
+    # Start of the revolution of a satellite holding the given time
+    def window(self, satellite, timestamp):
+        orbit = self.orbits[satellite]
+        epoch = orbit.get('epoch', 0.0)
+        return epoch + (timestamp - epoch) // orbit['period'] * orbit['period']
+
+    # Ground track of the revolution holding the given time, (latitudes, longitudes)
+    def track(self, satellite, timestamp):
+        start = self.window(satellite, timestamp)
+        with self.lock:
+            cached = self.tracks.get(satellite)
+            if cached is not None and cached[0] == start:
+                return cached[1:]
+
+        timestamps = start + np.linspace(0, self.orbits[satellite]['period'], self.samples)
+        latitude, longitude = self.positions([satellite], timestamps)
+        with self.lock:
+            self.tracks[satellite] = (start, latitude[0], longitude[0])
+        return latitude[0], longitude[0]
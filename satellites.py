@@ -0,0 +1,61 @@
+import json
+import os
+
+import telemetry_format
+
+##############################################################################################################
+# Satellite registry
+##############################################################################################################
+
+
+# Satellites known to the dashboard, loaded from a json config of the form
+#   {'satellites': [{'id', 'label', 'description', 'data': {'minute': path}, 'orbit': {...}}, ...]}
+# where data paths are relative to the config file and orbit holds the elements described in orbit.py.
+# Satellites without an orbit replay the positions of their recording, which then needs latitude and longitude.
+class SatelliteRegistry:
+    def __init__(self, satellites):
+        self.satellites = satellites
+        self.by_id = {satellite['id']: satellite for satellite in satellites}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            config = json.load(file)
+
+        data_dir = os.path.dirname(os.path.abspath(path))
+        satellites = []
+        for satellite in config['satellites']:
+            satellite = dict(satellite)
+            satellite['data'] = {resolution: os.path.join(data_dir, data_path)
+                                 for resolution, data_path in satellite['data'].items()}
+            if 'orbit' not in satellite:
+                header = telemetry_format.read_header(satellite['data']['minute'])
+                if not {'latitude', 'longitude'} <= {column['name'] for column in header['columns']}:
+                    raise ValueError('Satellite {} has no orbit and {} records no latitude/longitude'.format(
+                        satellite['id'], satellite['data']['minute']))
+            satellites.append(satellite)
+        return cls(satellites)
+
+    def __contains__(self, satellite):
+        return satellite in self.by_id
+
+    def __len__(self):
+        return len(self.satellites)
+
+    def __getitem__(self, satellite):
+        return self.by_id[satellite]
+
+    def ids(self):
+        return [satellite['id'] for satellite in self.satellites]
+
+    # Options for a dcc.Dropdown
+    def options(self):
+        return [{'label': satellite['label'], 'value': satellite['id']} for satellite in self.satellites]
+
+    # satellite -> {resolution: path}, as expected by datasets.DatasetCache
+    def data_paths(self):
+        return {satellite['id']: satellite['data'] for satellite in self.satellites}
+
+    # satellite -> orbital elements, as expected by orbit.OrbitTracks
+    def orbits(self):
+        return {satellite['id']: satellite['orbit'] for satellite in self.satellites if 'orbit' in satellite}
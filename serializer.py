@@ -0,0 +1,49 @@
+import json
+import os
+
+import numpy as np
+import plotly.io.json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+##############################################################################################################
+# JSON serialization
+##############################################################################################################
+
+# 'orjson' encodes NumPy arrays natively, 'json' is the standard library fallback, 'auto' picks orjson when it
+# is installed. Dash encodes callback responses with the plotly engine, which follows this setting.
+JSON_ENGINE = os.environ.get('JSON_ENGINE', 'auto')
+if JSON_ENGINE == 'auto':
+    JSON_ENGINE = 'orjson' if orjson is not None else 'json'
+plotly.io.json.config.default_engine = JSON_ENGINE
+
+# orjson.Fragment (orjson 3.9 or later) is written out as is, so JSON built once can be spliced into responses
+FRAGMENTS = JSON_ENGINE == 'orjson' and hasattr(orjson, 'Fragment')
+
+
+# NumPy values the standard encoder doesn't know, NaN in arrays becomes null like with orjson
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return np.where(np.isnan(value), None, value).tolist() if value.dtype.kind == 'f' else value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('{} is not JSON serializable'.format(type(value).__name__))
+
+
+# JSON text of a value that can hold NumPy arrays and scalars
+def dumps(value):
+    if JSON_ENGINE == 'orjson':
+        return orjson.dumps(value, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, default=_default, separators=(',', ':'))
+
+
+# Value to return from callbacks in place of one sent many times (e.g. a shared figure): encoded once when
+# the engine can splice JSON into responses, the value itself otherwise
+def fragment(value):
+    if FRAGMENTS:
+        return orjson.Fragment(dumps(value))
+    return value
@@ -0,0 +1,206 @@
+import contextlib
+import fcntl
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from telemetry import METRICS, ROLLUP_SECONDS, STATS, TIMES, RingBuffer, Rollup, TelemetryStore, rollup_width
+
+logger = logging.getLogger(__name__)
+
+##############################################################################################################
+# Shared telemetry store
+##############################################################################################################
+
+
+# Layout of one satellite in the shared file: a sequence number (odd while the satellite is being written),
+# when a client last asked for it, the row count of every resolution, the running aggregates of the rollups
+# and the rows themselves (raw samples with their times)
+def block_dtype(capacity):
+    fields = [('seq', '<i8'), ('requested', '<f8'), ('counts', '<i8', (1 + len(ROLLUP_SECONDS),)),
+              ('rollups', '<f8', (len(ROLLUP_SECONDS), rollup_width())),
+              ('minute', '<f8', (capacity, len(METRICS) + len(TIMES)))]
+    fields += [(resolution, '<f8', (capacity, len(METRICS) * len(STATS))) for resolution in ROLLUP_SECONDS]
+    return np.dtype(fields)
+
+
+# Array of length records of dtype backed by a file, created zero-filled (sparse) by the first process to map
+# it. Every process sizes the file the same way.
+def map_file(path, dtype, length):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < dtype.itemsize * length:
+            os.ftruncate(fd, dtype.itemsize * length)
+    finally:
+        os.close(fd)
+    return np.memmap(path, dtype=dtype, mode='r+', shape=(length,))
+
+
+# TelemetryStore whose buffers live in a memory-mapped file (put it on a tmpfs such as /dev/shm), so that
+# every process of the app (e.g. gunicorn workers) serves the same telemetry from one copy. One process at a
+# time is elected writer through a lock on the file, the others only read. Readers take no lock: they retry
+# while the sequence number of the satellite says a write is in progress or happened during the read.
+# Buffers of every satellite of the registry are allocated up front, the file is sparse until written. The
+# running aggregates live in the file too, so that a writer taking over continues where the last one stopped.
+class SharedTelemetryStore(TelemetryStore):
+    def __init__(self, path, satellites, capacity=60, alerts=None):
+        super().__init__(capacity, alerts)
+        self.path = path
+        self.index = {satellite: i for i, satellite in enumerate(satellites)}
+        self.blocks = map_file(path, block_dtype(capacity), len(satellites))
+        self.seq = self.blocks['seq']
+        self.requested = self.blocks['requested']
+
+        # Every process of the app holds a shared lock on the run file. The file outlives the app, so the first
+        # process of a run, which finds no one holding it, empties the telemetry of the previous run.
+        self.run_file = open(path + '.run', 'a')
+        try:
+            fcntl.flock(self.run_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.clear()
+        except OSError:
+            pass
+        fcntl.flock(self.run_file, fcntl.LOCK_SH)
+
+        counts = self.blocks['counts']
+        for satellite, i in self.index.items():
+            self.buffers[(satellite, 'minute')] = RingBuffer(capacity, data=self.blocks['minute'][i],
+                                                             counter=counts[i, 0:1])
+            for j, resolution in enumerate(ROLLUP_SECONDS):
+                self.buffers[(satellite, resolution)] = RingBuffer(capacity, data=self.blocks[resolution][i],
+                                                                   counter=counts[i, j + 1:j + 2])
+
+        # Process id of this process once it is the writer, and the lock file it holds
+        self.writer = None
+        self.lock_file = None
+
+    # Empty the buffers of every satellite and forget who asked for them
+    def clear(self):
+        self.seq[:] = 0
+        self.requested[:] = 0
+        self.blocks['counts'][:] = 0
+        self.blocks['rollups'][:] = 0
+        if self.alerts is not None:
+            for satellite in self.index:
+                self.alerts.reset(satellite)
+        logger.info('Process %s cleared the shared telemetry in %s', os.getpid(), self.path)
+
+    # Buffers are allocated up front and outlive a satellite nobody watches anymore, rollups are only used by
+    # the writer
+    def add_satellite(self, satellite):
+        i = self.index[satellite]
+        for j, (resolution, seconds) in enumerate(ROLLUP_SECONDS.items()):
+            self.rollups[(satellite, resolution)] = Rollup(seconds, self.buffers[(satellite, resolution)],
+                                                           state=self.blocks['rollups'][i, j])
+
+    def remove_satellite(self, satellite):
+        for resolution in ROLLUP_SECONDS:
+            self.rollups.pop((satellite, resolution), None)
+        if self.alerts is not None:
+            self.alerts.reset(satellite)
+
+    def ingest(self, satellite, timestamps, rows):
+        if (satellite, 'hour') not in self.rollups:
+            with self.lock:
+                self.add_satellite(satellite)
+        super().ingest(satellite, timestamps, rows)
+
+    # Try to become the writer, returns whether this process is it. The lock is released when the writer
+    # exits, another process takes over on its next call.
+    def elect(self):
+        if self.writer == os.getpid():
+            return True
+        with self.lock:
+            # A forked child shares the open file of its parent, it needs its own to hold the lock
+            if self.lock_file is not None:
+                self.lock_file.close()
+            self.lock_file = open(self.path + '.lock', 'a')
+            try:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock_file.close()
+                self.lock_file = None
+                return False
+            # A writer that died during a write left its sequence numbers odd
+            self.seq[self.seq % 2 == 1] += 1
+            self.writer = os.getpid()
+            logger.info('Process %s writes the shared telemetry in %s', self.writer, self.path)
+            return True
+
+    # Record that a client of this process watches the satellite
+    def request(self, satellite):
+        self.requested[self.index[satellite]] = time.time()
+
+    # Satellites some process was asked for in the last idle_timeout seconds
+    def watched(self, idle_timeout):
+        satellites = list(self.index)
+        return [satellites[i] for i in np.flatnonzero(time.time() - self.requested < idle_timeout)]
+
+    @contextlib.contextmanager
+    def writing(self, satellite):
+        i = self.index[satellite]
+        with self.lock:
+            self.seq[i] += 1
+            try:
+                yield
+            finally:
+                self.seq[i] += 1
+
+    def reading(self, satellite, read):
+        i = self.index[satellite]
+        deadline = None
+        while True:
+            before = self.seq[i]
+            if before % 2 == 0:
+                result = read()
+                if self.seq[i] == before:
+                    return result
+            # Past the deadline the writer most likely died mid-write, better stale rows than a hung worker
+            if deadline is None:
+                deadline = time.time() + 0.1
+            elif time.time() > deadline:
+                return read()
+            time.sleep(0)
+
+    # Other processes can't notify this one, poll the sample count
+    def wait(self, satellite, count, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            current = self.count(satellite)
+            if current != count or (deadline is not None and time.time() >= deadline):
+                return current
+            time.sleep(0.05)
+
+
+# Runs a telemetry source (ReplaySource or IngestServer) in the writer process of a SharedTelemetryStore only.
+# Every process records the satellites its clients ask for, the writer syncs the source for all of them each
+# period in a background thread, whichever process its clients are connected to.
+class SharedSource:
+    def __init__(self, source, store, period=2.0, idle_timeout=300):
+        self.source = source
+        self.store = store
+        self.period = period
+        self.idle_timeout = idle_timeout
+        self.thread = None
+
+    def sync(self, satellite=None):
+        if satellite is not None:
+            self.store.request(satellite)
+        if not self.store.elect():
+            return None
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='shared-telemetry-writer', daemon=True)
+            self.thread.start()
+        return self.source.sync(satellite)
+
+    def _run(self):
+        while True:
+            try:
+                self.source.sync()
+                for satellite in self.store.watched(self.idle_timeout):
+                    self.source.sync(satellite)
+            except Exception:
+                logger.exception('Shared telemetry writer failed to sync')
+            time.sleep(self.period)
@@ -0,0 +1,336 @@
+import contextlib
+import threading
+import time
+
+import numpy as np
+
+##############################################################################################################
+# Telemetry store
+##############################################################################################################
+
+# Column order of every telemetry row
+METRICS = ['elevation', 'temperature', 'speed', 'latitude', 'longitude', 'fuel', 'battery']
+METRIC_INDEX = {metric: i for i, metric in enumerate(METRICS)}
+
+NON_GPS_METRICS = ['elevation', 'temperature', 'speed', 'fuel', 'battery']
+GPS_METRICS = ['latitude', 'longitude']
+
+# Times kept with every raw sample after its metrics, in seconds since the epoch: when it was sampled and when
+# the store received it
+TIMES = ['sampled', 'ingested']
+
+# Views of the store: 'minute' keeps the raw samples, the others keep rollups of them, one row per bucket of
+# ROLLUP_SECONDS (the 'hour' view holds minute aggregates, the 'day' view hour aggregates)
+RESOLUTIONS = ['minute', 'hour', 'day']
+ROLLUP_SECONDS = {'hour': 60, 'day': 3600}
+
+# Aggregates kept per metric in a rollup row, which one a view shows per metric. Positions are not
+# averaged, the mean of a track crossing the antimeridian is meaningless.
+STATS = ['mean', 'min', 'max', 'last']
+VIEW_STATS = {metric: 'last' if metric in GPS_METRICS else 'mean' for metric in METRICS}
+
+
+# Fixed-size buffer of telemetry rows, new rows overwrite the oldest one. The rows and the row count can live
+# in arrays owned by someone else (e.g. shared memory), data of shape (capacity, width) and a 1 element counter.
+class RingBuffer:
+    def __init__(self, capacity, width=len(METRICS), data=None, counter=None):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, width)) if data is None else data
+        self.counter = np.zeros(1, dtype=np.int64) if counter is None else counter
+
+    # Total number of rows ever written, also used as a data version
+    @property
+    def count(self):
+        return int(self.counter[0])
+
+    @count.setter
+    def count(self, count):
+        self.counter[0] = count
+
+    def append(self, row):
+        self.data[self.count % self.capacity] = row
+        self.count += 1
+
+    def extend(self, rows):
+        # Only the newest `capacity` rows can survive the write, they land where they would have after writing
+        # every row, and every row counts
+        total = len(rows)
+        rows = rows[-self.capacity:]
+        start = (self.count + total - len(rows)) % self.capacity
+        end = start + len(rows)
+        if end <= self.capacity:
+            self.data[start:end] = rows
+        else:
+            split = self.capacity - start
+            self.data[start:] = rows[:split]
+            self.data[:end - self.capacity] = rows[split:]
+        self.count += total
+
+    def latest(self):
+        return self.data[(self.count - 1) % self.capacity]
+
+    # Values of one column, oldest first
+    def series(self, column):
+        values = self.data[:, column]
+        if self.count < self.capacity:
+            return values[:self.count].copy()
+        head = self.count % self.capacity
+        return np.concatenate((values[head:], values[:head]))
+
+
+# Length of the running aggregates of a Rollup
+def rollup_width(width=len(METRICS)):
+    return 2 + len(STATS) * width
+
+
+# Running mean/min/max/last of the samples in the current time bucket, appended to a RingBuffer as one row
+# (the STATS blocks side by side) when a sample of a later bucket arrives. Each sample is only added to
+# the running aggregates, so a tick costs the same whatever the bucket size. The aggregates can live in an
+# array owned by someone else (e.g. shared memory) of rollup_width(width), the bucket and the sample count
+# followed by the running total, low, high and last rows. All zeros is a rollup without samples.
+class Rollup:
+    def __init__(self, seconds, buffer, width=len(METRICS), state=None):
+        self.seconds = seconds
+        self.buffer = buffer
+        self.state = np.zeros(rollup_width(width)) if state is None else state
+        self.total, self.low, self.high, self.last = self.state[2:].reshape(len(STATS), width)
+
+    @property
+    def bucket(self):
+        return self.state[0]
+
+    @bucket.setter
+    def bucket(self, bucket):
+        self.state[0] = bucket
+
+    @property
+    def count(self):
+        return int(self.state[1])
+
+    @count.setter
+    def count(self, count):
+        self.state[1] = count
+
+    def _close(self):
+        if self.count:
+            self.buffer.append(np.concatenate((self.total / self.count, self.low, self.high, self.last)))
+        self.count = 0
+        self.total[:] = 0
+        self.low[:] = np.inf
+        self.high[:] = -np.inf
+
+    # Add samples in time order, timestamps in seconds
+    def add(self, timestamps, rows):
+        buckets = timestamps // self.seconds
+        if buckets[0] == buckets[-1]:
+            # Usual case of a tick, no need to look for bucket changes
+            self._add(buckets[0], rows)
+            return
+        # Runs of samples falling in the same bucket
+        starts = np.flatnonzero(np.diff(buckets)) + 1
+        for bucket, chunk in zip(buckets[np.r_[0, starts]], np.split(rows, starts)):
+            self._add(bucket, chunk)
+
+    def _add(self, bucket, rows):
+        state = self.state
+        if bucket != state[0]:
+            self._close()
+            state[0] = bucket
+        state[1] += len(rows)
+        if len(rows) == 1:
+            row = rows[0]
+            self.total += row
+            np.minimum(self.low, row, out=self.low)
+            np.maximum(self.high, row, out=self.high)
+        else:
+            self.total += rows.sum(axis=0)
+            np.minimum(self.low, rows.min(axis=0), out=self.low)
+            np.maximum(self.high, rows.max(axis=0), out=self.high)
+        self.last[:] = rows[-1]
+
+
+# Samples of the satellites per resolution. alerts is an optional alerts.AlertEngine fed with the newest sample
+# of every ingest, evaluated once per batch (see end_batch).
+class TelemetryStore:
+    def __init__(self, capacity=60, alerts=None):
+        self.capacity = capacity
+        self.alerts = alerts
+        self.buffers = {}
+        self.rollups = {}
+        # Reentrant so that sources holding it can ingest
+        self.lock = threading.RLock()
+        # Notified whenever samples are added
+        self.updated = threading.Condition(self.lock)
+
+    def __contains__(self, satellite):
+        return (satellite, 'minute') in self.buffers
+
+    def add_satellite(self, satellite):
+        self.buffers[(satellite, 'minute')] = RingBuffer(self.capacity, len(METRICS) + len(TIMES))
+        for resolution, seconds in ROLLUP_SECONDS.items():
+            self.buffers[(satellite, resolution)] = RingBuffer(self.capacity, len(METRICS) * len(STATS))
+            self.rollups[(satellite, resolution)] = Rollup(seconds, self.buffers[(satellite, resolution)])
+
+    def remove_satellite(self, satellite):
+        for resolution in RESOLUTIONS:
+            self.buffers.pop((satellite, resolution), None)
+            self.rollups.pop((satellite, resolution), None)
+        if self.alerts is not None:
+            self.alerts.reset(satellite)
+
+    # Samples of a satellite are only changed within writing and read through reading, which runs read() and
+    # returns its result. Stores sharing their buffers with other processes synchronize there.
+    @contextlib.contextmanager
+    def writing(self, satellite):
+        with self.lock:
+            yield
+
+    def reading(self, satellite, read):
+        with self.lock:
+            return read()
+
+    # Append samples of one satellite, timestamps are in seconds since the epoch. Every sample goes to the
+    # minute buffer with its times and into the running aggregates of the rollups.
+    def ingest(self, satellite, timestamps, rows):
+        samples = np.empty((len(rows), len(METRICS) + len(TIMES)))
+        samples[:, :len(METRICS)] = rows
+        samples[:, len(METRICS)] = timestamps
+        samples[:, len(METRICS) + 1] = time.time()
+        with self.lock:
+            if satellite not in self:
+                self.add_satellite(satellite)
+            with self.writing(satellite):
+                self.buffers[(satellite, 'minute')].extend(samples)
+                for resolution in ROLLUP_SECONDS:
+                    self.rollups[(satellite, resolution)].add(timestamps, rows)
+            if self.alerts is not None:
+                self.alerts.stage(satellite, rows[-1])
+            self.updated.notify_all()
+
+    # Sources call this once they ingested a batch of samples, of one satellite or many
+    def end_batch(self):
+        if self.alerts is not None:
+            self.alerts.evaluate()
+
+    # Block until the minute buffer of a satellite holds a sample count other than count, or until timeout,
+    # returns the current count
+    def wait(self, satellite, count, timeout=None):
+        with self.updated:
+            self.updated.wait_for(lambda: satellite in self and self.buffers[(satellite, 'minute')].count != count,
+                                  timeout)
+            return self.buffers[(satellite, 'minute')].count if satellite in self else count
+
+    def buffer(self, satellite, resolution='minute'):
+        return self.buffers[(satellite, resolution)]
+
+    # Column of a metric in the buffers of a resolution, stat defaults to the one the view shows
+    @staticmethod
+    def column(metric, resolution='minute', stat=None):
+        if resolution == 'minute':
+            return METRIC_INDEX[metric]
+        return STATS.index(stat or VIEW_STATS[metric]) * len(METRICS) + METRIC_INDEX[metric]
+
+    def count(self, satellite, resolution='minute'):
+        return self.buffer(satellite, resolution).count
+
+    # Values of the newest row, with the TIMES of the sample at the minute resolution (None before the first
+    # sample, the empty row has no times)
+    def latest(self, satellite, resolution='minute'):
+        buffer = self.buffer(satellite, resolution)
+        count, row = self.reading(satellite, lambda: (buffer.count, buffer.latest().copy()))
+        latest = {metric: row[self.column(metric, resolution)].item() for metric in METRICS}
+        if resolution == 'minute':
+            for i, name in enumerate(TIMES):
+                latest[name] = row[len(METRICS) + i].item() if count else None
+        return latest
+
+    # Series together with the number of samples written so far, read atomically
+    def snapshot(self, satellite, metric, resolution='minute', stat=None):
+        buffer = self.buffer(satellite, resolution)
+        return self.reading(satellite, lambda: (buffer.count, buffer.series(self.column(metric, resolution, stat))))
+
+
+##############################################################################################################
+# Recording replay
+##############################################################################################################
+
+# Plays recorded telemetry into a TelemetryStore, one sample per tick of the server clock, the rollup views
+# follow from the samples. Only satellites someone asked for in the last idle_timeout seconds are replayed,
+# their recordings come from a datasets.DatasetCache and their positions from an orbit.OrbitTracks.
+class ReplaySource:
+    def __init__(self, store, datasets, orbits, period=2.0, idle_timeout=300):
+        self.store = store
+        self.datasets = datasets
+        self.orbits = orbits
+        self.period = period
+        self.idle_timeout = idle_timeout
+        self.ticks_per_minute = max(1, int(round(60 / period)))
+        # Ticks replayed when a satellite starts or the clock jumps ahead, the minute view and the past hour
+        self.backfill = max(self.store.capacity, 60 * self.ticks_per_minute)
+        self.start = time.time()
+        self.tick = -1
+        # satellite -> time it was last asked for
+        self.watched = {}
+
+    # Telemetry rows of a satellite replayed at the given sample numbers, columns map metric -> recorded
+    # values. Positions come from the orbit of the satellite, or from its recording if it has none.
+    def _rows(self, satellite, columns, samples, timestamps):
+        rows = np.empty((len(samples), len(METRICS)))
+        for metric in NON_GPS_METRICS:
+            values = columns[metric]
+            rows[:, METRIC_INDEX[metric]] = values[samples % len(values)]
+        if satellite in self.orbits:
+            latitude, longitude = self.orbits.positions([satellite], timestamps)
+            rows[:, METRIC_INDEX['latitude']] = latitude[0]
+            rows[:, METRIC_INDEX['longitude']] = longitude[0]
+        else:
+            for metric in GPS_METRICS:
+                values = columns[metric]
+                rows[:, METRIC_INDEX[metric]] = values[(self.store.capacity + samples) % len(values)]
+        return rows
+
+    # First tick replayed when a satellite starts: the backfill, but never a sample older than the newest one the
+    # store holds already (its buffers are shared, and were written by the process replaying before this one)
+    def _first_tick(self, satellite):
+        first = self.tick - self.backfill + 1
+        if self.store.count(satellite):
+            sampled = self.store.latest(satellite)['sampled']
+            first = max(first, int((sampled - self.start) // self.period) + 1)
+        return first
+
+    # Replay the given samples of a satellite into the store
+    def _extend(self, satellite, samples):
+        dataset = self.datasets.get(satellite)
+        timestamps = self.start + samples * self.period
+        self.store.ingest(satellite, timestamps, self._rows(satellite, dataset['minute'], samples, timestamps))
+
+    # Catch up with the server clock and start replaying the given satellite if it isn't yet,
+    # returns the current tick
+    def sync(self, satellite=None):
+        now = int((time.time() - self.start) / self.period)
+        with self.store.lock:
+            if now > self.tick:
+                first = max(self.tick + 1, now - self.backfill + 1)
+                for watched, last_seen in list(self.watched.items()):
+                    if time.time() - last_seen > self.idle_timeout:
+                        del self.watched[watched]
+                        self.store.remove_satellite(watched)
+                    else:
+                        self._extend(watched, np.arange(first, now + 1))
+                self.tick = now
+                self.store.end_batch()
+                self.store.updated.notify_all()
+
+            if satellite is not None:
+                if satellite not in self.watched:
+                    # Satellites without a recording are rejected before any buffer is allocated for them
+                    if satellite not in self.datasets:
+                        raise KeyError('No recording for satellite {}'.format(satellite))
+                    # Fill the buffers with the samples up to the current tick
+                    self.store.add_satellite(satellite)
+                    samples = np.arange(self._first_tick(satellite), self.tick + 1)
+                    if len(samples):
+                        self._extend(satellite, samples)
+                        self.store.end_batch()
+                self.watched[satellite] = time.time()
+        return self.tick
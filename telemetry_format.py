@@ -0,0 +1,115 @@
+import argparse
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+
+##############################################################################################################
+# Columnar telemetry files
+##############################################################################################################
+
+# Layout of a .tlm file:
+#   4 bytes   magic, b'TLM1'
+#   4 bytes   little-endian uint32, length of the json header
+#   n bytes   json header, {'columns': [{'name', 'dtype', 'offset', 'length'}, ...]}
+#   columns   each column is contiguous and starts on a 64 byte boundary, offsets are from the file start
+MAGIC = b'TLM1'
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Create a file for the given column name -> length mapping, returns writable column arrays backed by the
+# file so large columns can be filled in chunks. Changes are on disk once the arrays are flushed or released.
+def create(path, lengths, dtype='<f8'):
+    dtype = np.dtype(dtype)
+    header = {'columns': [{'name': name, 'dtype': dtype.str, 'offset': 0, 'length': int(length)}
+                          for name, length in lengths.items()]}
+
+    # Offsets depend on the header size, which depends on the offsets, so repeat until they settle
+    data_start = 0
+    while True:
+        offset = data_start
+        for column in header['columns']:
+            column['offset'] = offset
+            offset += _align(column['length'] * dtype.itemsize)
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_end = _align(len(MAGIC) + 4 + len(header_bytes))
+        if header_end == data_start:
+            break
+        data_start = header_end
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        file.truncate(max([header_end] + [column['offset'] + column['length'] * dtype.itemsize
+                                          for column in header['columns']]))
+
+    mapped = np.memmap(path, dtype=np.uint8, mode='r+')
+    return _columns(mapped, header)
+
+
+# Write a mapping of column name -> 1d array, columns may have different lengths
+def write(path, columns):
+    file_columns = create(path, {name: len(values) for name, values in columns.items()})
+    for name, values in columns.items():
+        file_columns[name][:] = values
+    for values in file_columns.values():
+        values.flush()
+
+
+def read_header(path):
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a telemetry file'.format(path))
+        (header_length,) = struct.unpack('<I', file.read(4))
+        return json.loads(file.read(header_length).decode('utf-8'))
+
+
+# Memory-map a .tlm file, returns a mapping of column name -> read-only array backed by the file
+def load(path):
+    header = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    return _columns(mapped, header)
+
+
+def _columns(mapped, header):
+    columns = {}
+    for column in header['columns']:
+        dtype = np.dtype(column['dtype'])
+        end = column['offset'] + column['length'] * dtype.itemsize
+        columns[column['name']] = mapped[column['offset']:end].view(dtype)
+    return columns
+
+
+##############################################################################################################
+# CSV conversion
+##############################################################################################################
+
+# Convert the per-second recording of every satellite, non_gps_data_m_<n>.csv of a directory, into
+# telemetry_m_<n>.tlm. Positions come from the orbits in the satellite registry, and the hour view is rolled
+# up from the per-second samples.
+def convert_csv(data_dir):
+    import pandas as pd
+
+    converted = []
+    for non_gps_path in sorted(glob.glob(os.path.join(data_dir, 'non_gps_data_m_*.csv'))):
+        name = os.path.basename(non_gps_path)[len('non_gps_data_'):-len('.csv')]
+        df_non_gps = pd.read_csv(non_gps_path)
+        columns = {column: df_non_gps[column].to_numpy() for column in df_non_gps.columns}
+
+        path = os.path.join(data_dir, 'telemetry_{}.tlm'.format(name))
+        write(path, columns)
+        converted.append(path)
+    return converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the csv telemetry recordings to .tlm files.')
+    parser.add_argument('data_dir', nargs='?', default='./data')
+    args = parser.parse_args()
+    for path in convert_csv(args.data_dir):
+        print(path)